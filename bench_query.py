@@ -0,0 +1,48 @@
+import argparse
+import statistics
+import time
+
+from query import extract_query
+from snapshots import connect_frames
+from synthetic import invoice_tables
+
+# Times the extract query modes on DuckDB (pip install duckdb) over synthetic invoice tables:
+#   python bench_query.py --invoices-per-day 2000 --repeat 5
+
+MODES = {
+	'joined': dict(windowed=False),
+	'windowed': dict(windowed=True),
+	'joined, sparse': dict(windowed=False, sparse=True),
+	'windowed, sparse': dict(windowed=True, sparse=True),
+}
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Time the extract query modes on synthetic data.")
+	parser.add_argument('--invoices-per-day', type=int, default=500)
+	parser.add_argument('--repeat', type=int, default=5)
+	parser.add_argument('--threads', type=int, help="DuckDB threads (default: all cores)")
+	args = parser.parse_args()
+
+	tables = invoice_tables(args.invoices_per_day)
+	con = connect_frames(*tables)
+	if args.threads:
+		con.execute(f"SET threads = {args.threads}")
+	print(f"{len(tables[0]):,} invoices, {len(tables[2]):,} items")
+
+	results = {}
+	for mode, options in MODES.items():
+		sql = extract_query(dialect='duckdb', **options)
+		rows = len(con.execute(sql).fetchall()) # warm-up
+		timings = []
+		for _ in range(args.repeat):
+			start = time.perf_counter()
+			con.execute(sql).fetchall()
+			timings.append(time.perf_counter() - start)
+		results[mode] = statistics.median(timings)
+		print(f"{mode:<18} {rows:>9,} rows  {results[mode] * 1000:8.1f} ms")
+	print(f"windowed vs joined: {results['joined'] / results['windowed']:.2f}x")
+
+
+if __name__ == '__main__':
+	main()
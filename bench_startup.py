@@ -0,0 +1,59 @@
+import argparse
+import datetime
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Times a cold start of the app: a fresh interpreter importing app.py and running the page once with
+# nothing uploaded, as after an idle shutdown. --output appends the result as a JSON line, to
+# compare releases:
+#   python bench_startup.py --repeat 5 --output startup.jsonl
+
+PLOTTING_MODULES = ['plotly.express', 'matplotlib', 'seaborn'] # loaded by the views that need them, not at startup (streamlit itself imports plotly)
+
+_COLD_START = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+AppTest.from_file('app.py', default_timeout=120).run()
+print(json.dumps({
+	'streamlit_import_s': imported - start,
+	'first_run_s': time.perf_counter() - imported,
+	'plotting_loaded': sorted(module for module in %r if module in sys.modules),
+}))
+""" % PLOTTING_MODULES
+
+
+def cold_start():
+	"""Timings of one cold start, in a new interpreter."""
+	result = subprocess.run([sys.executable, '-c', _COLD_START], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True)
+	return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Time a cold start of the app.")
+	parser.add_argument('--repeat', type=int, default=5)
+	parser.add_argument('--output', metavar='FILE', help="append the result to this JSON lines file")
+	args = parser.parse_args()
+
+	runs = [cold_start() for _ in range(args.repeat)]
+	result = {
+		'date': datetime.datetime.now().isoformat(timespec='seconds'),
+		'python': sys.version.split()[0],
+		'streamlit_import_s': statistics.median(run['streamlit_import_s'] for run in runs),
+		'first_run_s': statistics.median(run['first_run_s'] for run in runs),
+		'plotting_loaded': runs[-1]['plotting_loaded'],
+	}
+	print(f"streamlit import {result['streamlit_import_s'] * 1000:8.1f} ms")
+	print(f"first page run   {result['first_run_s'] * 1000:8.1f} ms")
+	print(f"plotting loaded  {', '.join(result['plotting_loaded']) or 'none'}")
+	if args.output:
+		with open(args.output, 'a') as file:
+			file.write(json.dumps(result) + '\n')
+
+
+if __name__ == '__main__':
+	main()
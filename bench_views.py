@@ -0,0 +1,123 @@
+import argparse
+import datetime
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+from synthetic import extract
+
+# Times the app's stages on made-up extracts (synthetic.extract) at several scales: ingestion, flag
+# derivation, the cube and summary tables, cold heatmap rendering, and each of the three views as
+# the page runs them. --output appends one JSON line per scale and stage, to compare versions:
+#   python bench_views.py --scales small medium --output bench_results.jsonl
+
+SCALES = {
+	'small': dict(stores=4, registers=6, years=4, days=22), # about the size of the real extract
+	'medium': dict(stores=8, registers=12, years=4, days=22),
+	'large': dict(stores=16, registers=24, years=6, days=22),
+}
+
+VIEWS = ["Store Activity Breakdown", "Unmanned Registers Presence", "Unmanned Registers Count"]
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+
+
+def _timed(timings, stage, function, *args):
+	start = time.perf_counter()
+	result = function(*args)
+	timings[stage] = time.perf_counter() - start
+	return result
+
+
+def time_pipeline(data, timings):
+	"""Time the steps from an uploaded CSV to the cube, the summaries and the heatmaps."""
+	from config import DEFAULT_DAYS, DEFAULT_YEARS, HEATMAP_STORES
+	from cube import Cube
+	from flags import derive_flags
+	from heatmaps import HEATMAP_VIEWS, render_heatmap, unmanned_counts
+	from ingest import read_upload
+	from summaries import daily_summaries
+
+	frame, _ = _timed(timings, 'ingest', read_upload, data)
+	frame = _timed(timings, 'flags', derive_flags, frame)
+	cube = _timed(timings, 'cube', Cube, frame)
+	_timed(timings, 'summaries', daily_summaries, cube)
+	for view in HEATMAP_VIEWS:
+		_timed(timings, f'heatmaps {view}', lambda: [render_heatmap(view, store_code, unmanned_counts(cube, view, store_code, DEFAULT_YEARS, DEFAULT_DAYS))
+		                                             for store_code in HEATMAP_STORES])
+
+
+def time_views(data, directory, timings):
+	"""Time each view's first run in the page, on the data stored as the local dataset in `directory`.
+
+	A view's time is the sum of its top-level stages in the page's stage log (see timings.py).
+	The background warm-up is off, so each view renders its own heatmaps.
+	"""
+	import streamlit as st
+	from streamlit.testing.v1 import AppTest
+
+	from dataset import PartitionedDataset
+
+	shutil.rmtree(directory, ignore_errors=True)
+	PartitionedDataset(directory).upsert(data)
+	st.cache_resource.clear() # the page loads the rewritten dataset; the views' caches start empty
+	for view in VIEWS:
+		page = AppTest.from_file(APP, default_timeout=600)
+		page.run()
+		[radio for radio in page.radio if radio.label == "**Source**"][0].set_value("Local dataset")
+		[radio for radio in page.radio if view in radio.options][0].set_value(view)
+		page.run()
+		if page.exception:
+			raise RuntimeError(f"{view}: {page.exception[0].value}")
+		runs = page.session_state['stage_log'].frame()
+		stages = runs[(runs['label'] == view) & (runs['depth'] == 0)]
+		timings[f'view {view}'] = stages['seconds'].sum()
+
+
+def _version():
+	try:
+		return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=os.path.dirname(APP), capture_output=True, text=True, check=True).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Time the app's stages on synthetic extracts.")
+	parser.add_argument('--scales', nargs='+', choices=list(SCALES), default=list(SCALES))
+	parser.add_argument('--partition-minutes', type=int, default=30, help="time partition width, a multiple of 30")
+	parser.add_argument('--no-views', action='store_true', help="skip the page runs (no Streamlit needed)")
+	parser.add_argument('--output', metavar='FILE', help="append the results to this JSON lines file")
+	args = parser.parse_args()
+
+	# the page reads the local dataset from DATASET_DIR, and renders views only when asked
+	directory = os.path.join(tempfile.mkdtemp(prefix='bench_views_'), 'dataset')
+	os.environ['DATASET_DIR'] = directory
+	os.environ['PRECOMPUTE_VIEWS'] = '0'
+
+	version, date = _version(), datetime.datetime.now().isoformat(timespec='seconds')
+	try:
+		for scale in args.scales:
+			options = dict(SCALES[scale], partition_minutes=args.partition_minutes)
+			data = extract(**options).to_csv(index=False).encode()
+			rows = data.count(b'\n') - 1
+			timings = {}
+			time_pipeline(data, timings)
+			if not args.no_views:
+				time_views(data, directory, timings)
+
+			print(f"{scale}: {rows:,} rows ({', '.join(f'{key} {value}' for key, value in options.items())})")
+			for stage, seconds in timings.items():
+				print(f"  {stage:<36} {seconds * 1000:9.1f} ms")
+			if args.output:
+				with open(args.output, 'a') as file:
+					for stage, seconds in timings.items():
+						file.write(json.dumps({'date': date, 'version': version, 'scale': scale, **options, 'rows': rows, 'stage': stage, 'seconds': seconds}) + '\n')
+	finally:
+		shutil.rmtree(os.path.dirname(directory), ignore_errors=True)
+
+
+if __name__ == '__main__':
+	main()
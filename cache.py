@@ -0,0 +1,64 @@
+import threading
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+	"""Thread-safe least-recently-used cache bounded by the total size of its values.
+
+	`sizeof` returns the size of a value in bytes; once the total goes over `max_bytes`
+	the least recently used entries are evicted. A single value larger than the whole
+	budget is still kept (on its own) so the current upload is always served from memory.
+	"""
+
+	def __init__(self, max_bytes, sizeof):
+		self.max_bytes = max_bytes
+		self.sizeof = sizeof
+		self._entries = OrderedDict()
+		self._nbytes = 0
+		self._lock = threading.RLock()
+
+	def __contains__(self, key):
+		with self._lock:
+			return key in self._entries
+
+	def __len__(self):
+		with self._lock:
+			return len(self._entries)
+
+	@property
+	def nbytes(self):
+		return self._nbytes
+
+	def get(self, key, default=None):
+		with self._lock:
+			if key not in self._entries:
+				return default
+			self._entries.move_to_end(key)
+			return self._entries[key][0]
+
+	def put(self, key, value):
+		size = self.sizeof(value)
+		with self._lock:
+			if key in self._entries:
+				self._nbytes -= self._entries.pop(key)[1]
+			self._entries[key] = (value, size)
+			self._nbytes += size
+			while self._nbytes > self.max_bytes and len(self._entries) > 1:
+				_, (_, evicted_size) = self._entries.popitem(last=False)
+				self._nbytes -= evicted_size
+		return value
+
+	def get_or_create(self, key, factory):
+		# factory runs outside the lock so slow builds don't block other keys;
+		# two concurrent misses on one key may both build it, the last one wins
+		value = self.get(key, _MISSING)
+		if value is _MISSING:
+			value = self.put(key, factory())
+		return value
+
+	def clear(self):
+		with self._lock:
+			self._entries.clear()
+			self._nbytes = 0
@@ -0,0 +1,32 @@
+# Tournament parameters shared by the extract query and the local pipeline
+
+# Store code -> store name in cms.store_v
+STORES = {
+	'11G': 'US OPEN Tennis Championships - 11G',
+	'S2': 'US OPEN Tennis Championships - S2',
+	'OCT': 'US OPEN Tennis Championships- OCT',
+	'22B': 'US OPEN Tennis Championships - 22B',
+}
+
+# Per year: start of the main draw (date index 0) and the extracted date range
+TOURNAMENTS = {
+	2021: {'main_draw_start': '2021-08-30', 'extract_from': '2021-08-23', 'extract_to': '2021-09-13'}, # days -7 through 14
+	2022: {'main_draw_start': '2022-08-29', 'extract_from': '2022-08-22', 'extract_to': '2022-09-12'}, # days -7 through 14
+	2023: {'main_draw_start': '2023-08-28', 'extract_from': '2023-08-21', 'extract_to': '2023-09-11'}, # days -7 through 14
+	2024: {'main_draw_start': '2024-08-26', 'extract_from': '2024-08-18', 'extract_to': '2024-09-09'}, # days -8 through 14
+}
+
+CURRENT_YEAR = 2024 # its latest day only has time partitions up to the latest sale
+
+OPENING_HOURS = ('10:00', '22:00') # invoices outside these hours are ignored
+
+ELAPSED_TIME_CAP = 300 # seconds; longer invoices count as this long
+
+HIGH_ACTIVITY_FLOOR = 25 # a time partition needs at least this many store invoices to be High
+
+FRICTIONLESS_WORKSTATIONS = {2024: [11]} # per year, never counted as Unmanned
+
+# Stores drawn in the heatmap views, and the views' default year and date index filters
+HEATMAP_STORES = ['S2', '22B', '11G', 'OCT']
+DEFAULT_YEARS = [2024]
+DEFAULT_DAYS = range(0,14) # day 0 is the start of the main draw
@@ -0,0 +1,53 @@
+from schema import memory_usage
+
+YDTW_KEYS = ['STORE_CODE', 'CREATED_YEAR', 'DATE_INDEX', 'WORKSTATION', 'TIME_SLOT']
+YDT_KEYS = ['STORE_CODE', 'CREATED_YEAR', 'DATE_INDEX', 'TIME_SLOT']
+YD_KEYS = ['STORE_CODE', 'CREATED_YEAR', 'DATE_INDEX']
+
+
+def select(frame, *keys):
+	"""Rows of a cube frame whose leading index levels match `keys`.
+
+	Each key is a single label or a list of labels; labels that are not in the data are
+	ignored and an empty frame is returned when nothing matches.
+	"""
+	locator = []
+	for level, key in zip(frame.index.levels, keys):
+		if isinstance(key, (list, tuple, range)):
+			key = [label for label in key if label in level]
+			if not key:
+				return frame.iloc[:0]
+		locator.append(key)
+	locator += [slice(None)] * (frame.index.nlevels - len(locator))
+	try:
+		return frame.loc[tuple(locator), :]
+	except KeyError:
+		return frame.iloc[:0]
+
+
+class Cube:
+	"""Register volumes indexed and pre-aggregated at each grain the views slice by.
+
+	ydtw - one row per store/year/date/workstation/time slot (the uploaded extract)
+	ydt  - per store/year/date/time slot: store invoices, registers Unmanned_High and
+	       registers in a high-activity period (as counts, and as "any register" flags)
+	yd   - per store/year/date: daily store invoices
+	"""
+
+	def __init__(self, data_all):
+		self.ydtw = data_all.set_index(YDTW_KEYS).sort_index()
+		self.ydtw.attrs = dict(data_all.attrs)
+
+		self.ydt = self.ydtw.groupby(level=YDT_KEYS, observed=True).agg(
+			INVOICE_COUNT=('INVOICE_COUNT', 'sum'),
+			Unmanned_High=('Unmanned_High', 'any'),
+			Activity_Level_High=('Activity_Level_High', 'any'),
+			Unmanned_High_Count=('Unmanned_High', 'sum'),
+			Activity_Level_High_Count=('Activity_Level_High', 'sum'),
+		)
+
+		self.yd = self.ydtw.groupby(level=YD_KEYS, observed=True)[['DAILY_STORE_INVOICE_COUNT']].first()
+
+	@property
+	def nbytes(self):
+		return memory_usage(self.ydtw) + memory_usage(self.ydt) + memory_usage(self.yd)
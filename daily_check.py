@@ -0,0 +1,82 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from config import DEFAULT_DAYS, DEFAULT_YEARS, HEATMAP_STORES
+from cube import Cube
+from heatmaps import HEATMAP_VIEWS, render_heatmap, unmanned_counts
+from summaries import daily_summaries
+
+# The daily check without the web page (and without importing Streamlit): loads an extract and
+# writes the summary tables and the heatmaps to a directory, e.g. from cron at 06:00:
+#   python daily_check.py --extract extract.csv --output daily_check
+
+
+def load_cube(args):
+	"""The Cube of the extract given on the command line, prepared as the app does."""
+	if args.extract:
+		from ingest import prepare_uploads
+		uploads = []
+		for path in args.extract:
+			with open(path, 'rb') as file:
+				uploads.append((os.path.basename(path), file.read()))
+		return Cube(prepare_uploads(uploads))
+	if args.snapshot:
+		from ingest import prepare_extract
+		from snapshots import run_extract
+		return Cube(prepare_extract(run_extract(args.snapshot)))
+	from dataset import PartitionedDataset
+	dataset = PartitionedDataset(args.dataset)
+	if not len(dataset):
+		raise SystemExit(f"No stored days in {args.dataset}")
+	return Cube(dataset.frame())
+
+
+def write_heatmaps(cube, directory, stores, years, days, workers):
+	"""Render every heatmap view of `stores` to directory/<view>_<store>.png; returns the paths."""
+	os.makedirs(directory, exist_ok=True)
+	jobs = [(view, store_code, unmanned_counts(cube, view, store_code, years, days)) for view in HEATMAP_VIEWS for store_code in stores]
+	if workers > 1:
+		with ProcessPoolExecutor(workers) as executor:
+			images = list(executor.map(render_heatmap, *zip(*jobs)))
+	else:
+		images = [render_heatmap(*job) for job in jobs]
+
+	paths = []
+	for (view, store_code, _), image in zip(jobs, images):
+		path = os.path.join(directory, f'{view}_{store_code}.png')
+		with open(path, 'wb') as file:
+			file.write(image)
+		paths.append(path)
+	return paths
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Run the daily check and write its tables and heatmaps.")
+	source = parser.add_mutually_exclusive_group(required=True)
+	source.add_argument('--extract', nargs='+', metavar='FILE', help="uploads in any of the app's layouts and formats; where they share rows, the last file wins")
+	source.add_argument('--snapshot', metavar='DIR', help="run the extract query on the local snapshot in DIR")
+	source.add_argument('--dataset', metavar='DIR', help="the local partitioned dataset in DIR")
+	parser.add_argument('--output', default='daily_check', help="directory for the results (default: %(default)s)")
+	parser.add_argument('--years', nargs='+', type=int, default=DEFAULT_YEARS, help="heatmap years (default: %(default)s)")
+	parser.add_argument('--days', nargs='+', type=int, default=list(DEFAULT_DAYS), help="heatmap date indexes (default: 0 to 13)")
+	parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1), help="processes rendering heatmaps")
+	args = parser.parse_args()
+
+	start = time.perf_counter()
+	cube = load_cube(args)
+	loaded = time.perf_counter()
+
+	os.makedirs(args.output, exist_ok=True)
+	store_days, registers = daily_summaries(cube)
+	store_days.to_csv(os.path.join(args.output, 'store_days.csv'), index=False)
+	registers.to_csv(os.path.join(args.output, 'registers.csv'), index=False)
+	heatmaps = write_heatmaps(cube, os.path.join(args.output, 'heatmaps'), HEATMAP_STORES, args.years, args.days, args.workers)
+
+	print(f"{len(cube.ydtw):,} rows loaded in {loaded - start:.1f} s")
+	print(f"{len(store_days):,} store days, {len(registers):,} register days and {len(heatmaps)} heatmaps written to {args.output} in {time.perf_counter() - loaded:.1f} s")
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,137 @@
+import glob
+import hashlib
+import os
+import threading
+
+import pandas as pd
+
+from config import CURRENT_YEAR
+from engine import VOLUME_COLUMNS, classify, expand_baseplate
+from flags import derive_flags
+from ingest import content_hash, read_upload
+from schema import compact, concat_compact, memory_usage, to_time_partition
+
+# The daily extract kept on disk as one Parquet file per year/store/date index, already compacted
+# and flagged. A daily upload then only needs the days that changed (the current year's, see
+# extract_query's only_year); the other days are read once at startup and never parsed again.
+
+DATASET_DIR = os.environ.get('DATASET_DIR', 'dataset')
+
+PARTITION_KEYS = ['CREATED_YEAR', 'STORE_CODE', 'DATE_INDEX']
+
+
+def _partition_keys(frame):
+	return {(int(year), str(store_code), int(date_index)) for year, store_code, date_index in frame[PARTITION_KEYS].drop_duplicates().itertuples(index=False)}
+
+
+def _sales_volumes(frame):
+	"""Volumes (engine.VOLUME_COLUMNS) of the rows of a compact frame with sales."""
+	frame = frame[frame['INVOICE_COUNT'] > 0]
+	return frame.assign(
+		TIME_PARTITION=to_time_partition(frame['TIME_SLOT']),
+		STORE_CODE=frame['STORE_CODE'].astype(str),
+	)[VOLUME_COLUMNS].astype({column: 'int64' for column in ['CREATED_YEAR', 'DATE_INDEX', 'WORKSTATION', 'INVOICE_COUNT']})
+
+
+class PartitionedDataset:
+	"""Prepared extract rows by (year, store, date index) partition, upserted one upload at a time."""
+
+	def __init__(self, directory=DATASET_DIR):
+		self.directory = directory
+		self._lock = threading.Lock()
+		self._partitions = {}
+		self._applied = set() # content hashes of the uploads already upserted
+		for path in glob.glob(os.path.join(directory, '*', '*', '*.parquet')):
+			year, store_code, date_index = os.path.relpath(path, directory)[:-len('.parquet')].split(os.sep)
+			self._partitions[(int(year), store_code, int(date_index))] = pd.read_parquet(path)
+		self.version = self._listing_version()
+
+	def __len__(self):
+		return len(self._partitions)
+
+	def _path(self, key):
+		year, store_code, date_index = key
+		return os.path.join(self.directory, str(year), store_code, f'{date_index}.parquet')
+
+	def _listing_version(self):
+		files = sorted((path, os.stat(path).st_mtime_ns) for path in map(self._path, self._partitions))
+		return hashlib.sha256(repr((self.directory, files)).encode()).hexdigest()
+
+	def _stored_volumes(self, store_codes, excluded):
+		"""Volumes of the stored rows with sales for `store_codes`, outside the `excluded` partitions."""
+		frames = [frame for key, frame in self._partitions.items() if key[1] in store_codes and key not in excluded]
+		if not frames:
+			return pd.DataFrame(columns=VOLUME_COLUMNS)
+		return _sales_volumes(concat_compact(frames))
+
+	def _rolled_days(self, volumes, uploaded):
+		"""Stored latest CURRENT_YEAR days of the stores that `volumes` move past.
+
+		They were stored with the time partitions seen so far on the day only (see
+		expand_baseplate), and need the whole day's baseplate once a later day is in.
+		"""
+		current = volumes[volumes['CREATED_YEAR'] == CURRENT_YEAR]
+		rolled = set()
+		for store_code, latest in current.groupby('STORE_CODE', observed=True)['DATE_INDEX'].max().items():
+			stored = [key for key in self._partitions if key[:2] == (CURRENT_YEAR, store_code)]
+			if stored and max(stored)[2] < latest and max(stored) not in uploaded:
+				rolled.add(max(stored))
+		return rolled
+
+	def _classify_days(self, volumes, uploaded, keys):
+		"""Zero rows, activity levels and statuses for the `keys` partitions only.
+
+		The baseplate of a store depends on its other days (the dates and time partitions seen in
+		any year, the workstations seen in the year), so those are taken from the stored days
+		outside the `uploaded` partitions.
+		"""
+		stored = self._stored_volumes(set(volumes['STORE_CODE']), uploaded)
+		baseplate = expand_baseplate(pd.concat([volumes[VOLUME_COLUMNS], stored], ignore_index=True))
+		kept = pd.MultiIndex.from_frame(baseplate[PARTITION_KEYS]).isin(list(keys))
+		return classify(baseplate[kept])
+
+	def upsert(self, data, progress=None):
+		"""Replace the partitions found in an upload (any layout of ingest.read_upload); returns their keys.
+
+		Days that are not in the upload keep the rows they were stored with, except the latest
+		CURRENT_YEAR day of a store the upload adds a later day for, which is classified again.
+		"""
+		data_hash = content_hash(data)
+		with self._lock:
+			if data_hash in self._applied:
+				return []
+			frame, complete = read_upload(data, progress)
+			volumes = _sales_volumes(frame) if complete else frame
+			uploaded = _partition_keys(frame)
+			rolled = self._rolled_days(volumes, uploaded)
+			if not complete:
+				prepared = compact(self._classify_days(volumes, uploaded, uploaded | rolled))
+			elif rolled:
+				prepared = concat_compact([frame, compact(self._classify_days(volumes, uploaded, rolled))])
+			else:
+				prepared = frame
+			prepared = derive_flags(prepared)
+
+			os.makedirs(self.directory, exist_ok=True)
+			keys = []
+			for key, partition in prepared.groupby(PARTITION_KEYS, observed=True, sort=False):
+				key = (int(key[0]), str(key[1]), int(key[2]))
+				partition = partition.reset_index(drop=True)
+				path = self._path(key)
+				os.makedirs(os.path.dirname(path), exist_ok=True)
+				partition.to_parquet(path + '.tmp', index=False)
+				os.replace(path + '.tmp', path)
+				self._partitions[key] = partition
+				keys.append(key)
+			self._applied.add(data_hash)
+			self.version = self._listing_version()
+			return keys
+
+	def frame(self):
+		"""All stored rows, in the layout of ingest.prepare_uploads."""
+		with self._lock:
+			if not self._partitions:
+				return pd.DataFrame()
+			data_all = concat_compact(list(self._partitions.values()))
+		data_all.attrs['memory'] = {'compact_bytes': memory_usage(data_all)}
+		return data_all
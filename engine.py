@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+
+from config import CURRENT_YEAR, ELAPSED_TIME_CAP, FRICTIONLESS_WORKSTATIONS, HIGH_ACTIVITY_FLOOR, OPENING_HOURS, STORES, TOURNAMENTS
+from schema import READ_DTYPES
+
+# Local, vectorized version of the extract query: invoices in, the final SELECT's columns out.
+# Each stage matches a group of CTEs in the query so the two can be checked against each other.
+
+# One row per invoice, or per invoice item (qty and amount are then summed per invoice)
+INVOICE_COLUMNS = ['invc_sid', 'created_date', 'store', 'workstation', 'elapsed_time', 'qty', 'amount']
+
+VOLUME_KEYS = ['CREATED_YEAR', 'DATE_INDEX', 'TIME_PARTITION', 'STORE_CODE', 'WORKSTATION']
+VOLUME_COLUMNS = VOLUME_KEYS + ['INVOICE_COUNT', 'TRANSACTIONS_TIME', 'QTY_ITEMS_SOLD', 'TOTAL_SALES']
+
+STORE_CODES = {name: code for code, name in STORES.items()}
+
+
+def _minutes(hhmi):
+	hours, minutes = hhmi.split(':')
+	return int(hours) * 60 + int(minutes)
+
+
+def _tournament_dates(field):
+	return {year: pd.Timestamp(dates[field]) for year, dates in TOURNAMENTS.items()}
+
+
+# Per-invoice totals of its lines; applying them again to partial totals gives the same result
+_INVOICE_TOTALS = {'created_date': 'first', 'store': 'first', 'workstation': 'first', 'elapsed_time': 'first', 'qty': 'sum', 'amount': 'sum'}
+
+
+def invoice_totals(invoices):
+	"""Kept invoice lines totalled per invoice (indexed by invc_sid).
+
+	`store` may hold the store name from cms.store_v or the store code. The totals of several
+	chunks of the same invoices can be concatenated and passed on to totals_to_baskets.
+	"""
+	invoices = invoices.rename(columns=str.lower)[INVOICE_COLUMNS]
+	created = pd.to_datetime(invoices['created_date'])
+	store_code = invoices['store'].map(STORE_CODES).fillna(invoices['store'])
+
+	year = created.dt.year
+	extract_from = year.map(_tournament_dates('extract_from'))
+	extract_to = year.map(_tournament_dates('extract_to'))
+	minute_of_day = created.dt.hour * 60 + created.dt.minute
+	kept = (
+		store_code.isin(list(STORES))
+		& (created >= extract_from) & (created <= extract_to)
+		& minute_of_day.between(*map(_minutes, OPENING_HOURS))
+	).to_numpy()
+
+	invoices = invoices[kept].assign(created_date=created[kept], store=store_code[kept])
+	return invoices.groupby('invc_sid', sort=False).agg(_INVOICE_TOTALS)
+
+
+def invoice_baskets(invoices):
+	"""Kept invoices with their year, date index, time partition and basket (the invoice_* CTEs)."""
+	return totals_to_baskets(invoice_totals(invoices))
+
+
+def totals_to_baskets(totals):
+	"""invoice_baskets from invoice_totals, possibly concatenated from several chunks."""
+	if not totals.index.is_unique: # invoices split across chunks
+		totals = totals.groupby(level='invc_sid', sort=False).agg(_INVOICE_TOTALS)
+	baskets = totals.rename(columns={'store': 'STORE_CODE', 'workstation': 'WORKSTATION', 'qty': 'basket_size', 'amount': 'basket_amt'})
+	baskets = baskets[baskets['basket_size'] > 0].reset_index() # drop return/exchange invoices
+
+	created = baskets['created_date']
+	main_draw_start = created.dt.year.map(_tournament_dates('main_draw_start'))
+	baskets['CREATED_YEAR'] = created.dt.year
+	baskets['DATE_INDEX'] = (created.dt.normalize() - main_draw_start).dt.days
+	baskets['TIME_PARTITION'] = created.dt.hour + np.where(created.dt.minute > 30, 0.5, 0.0)
+	baskets['elapsed_time'] = baskets['elapsed_time'].clip(upper=ELAPSED_TIME_CAP)
+	return baskets
+
+
+def register_volumes(baskets):
+	"""Invoice volumes per year/date/time/store/workstation, only where there were sales."""
+	volumes = baskets.groupby(VOLUME_KEYS, sort=False).agg(
+		INVOICE_COUNT=('invc_sid', 'size'),
+		TRANSACTIONS_TIME=('elapsed_time', 'sum'),
+		QTY_ITEMS_SOLD=('basket_size', 'sum'),
+		TOTAL_SALES=('basket_amt', 'sum'),
+	)
+	return volumes.reset_index()
+
+
+def expand_baseplate(volumes, current_year=CURRENT_YEAR):
+	"""Add the zero-volume rows of the baseplate (the register_volumes_ydtw_* CTEs).
+
+	Per store, every year is crossed with every date index and time partition seen in any
+	year, and with the workstations seen in that year. For `current_year` the dates stop at
+	its latest date index, and on that day only the time partitions seen so far are kept.
+	"""
+	years = volumes[['STORE_CODE', 'CREATED_YEAR']].drop_duplicates()
+	dates = volumes[['STORE_CODE', 'DATE_INDEX']].drop_duplicates()
+	times = volumes[['STORE_CODE', 'TIME_PARTITION']].drop_duplicates()
+	workstations = volumes[['STORE_CODE', 'CREATED_YEAR', 'WORKSTATION']].drop_duplicates()
+	baseplate = years.merge(dates, on='STORE_CODE').merge(times, on='STORE_CODE').merge(workstations, on=['STORE_CODE', 'CREATED_YEAR'])
+
+	current = volumes[volumes['CREATED_YEAR'] == current_year]
+	current_day = current.groupby('STORE_CODE')['DATE_INDEX'].max().rename('CURRENT_DAY')
+	current_times = current.merge(current_day, left_on=['STORE_CODE', 'DATE_INDEX'], right_on=['STORE_CODE', 'CURRENT_DAY'])
+	current_times = current_times[['STORE_CODE', 'TIME_PARTITION']].drop_duplicates().assign(CURRENT_TIME=True)
+
+	baseplate = baseplate.merge(current_day, on='STORE_CODE', how='left').merge(current_times, on=['STORE_CODE', 'TIME_PARTITION'], how='left')
+	is_current = (baseplate['CREATED_YEAR'] == current_year).to_numpy()
+	day = baseplate['DATE_INDEX'].to_numpy()
+	current_day = baseplate['CURRENT_DAY'].to_numpy()
+	kept = ~is_current | (day < current_day) | ((day == current_day) & baseplate['CURRENT_TIME'].notna().to_numpy())
+
+	ydtw = baseplate.loc[kept, VOLUME_KEYS].merge(volumes, on=VOLUME_KEYS, how='left')
+	measures = VOLUME_COLUMNS[len(VOLUME_KEYS):]
+	ydtw[measures] = ydtw[measures].fillna(0)
+	ydtw['INVOICE_COUNT'] = ydtw['INVOICE_COUNT'].astype('int64')
+	return ydtw
+
+
+def classify(ydtw):
+	"""Activity levels, workstation types, statuses and daily totals (activity_levels through the final SELECT)."""
+	ydtw = ydtw.copy()
+	invoices_ydt = ydtw.groupby(['CREATED_YEAR', 'DATE_INDEX', 'STORE_CODE', 'TIME_PARTITION'])['INVOICE_COUNT'].sum()
+	by_day = invoices_ydt.groupby(level=['CREATED_YEAR', 'DATE_INDEX', 'STORE_CODE'])
+	yd = pd.DataFrame({
+		'invoice_count_yd': by_day.sum(),
+		'avg': by_day.mean(),
+		'std': by_day.std().fillna(0), # Oracle's STDDEV of a single row is 0
+	})
+	activity = invoices_ydt.rename('invoice_count_ydt').reset_index().join(yd, on=['CREATED_YEAR', 'DATE_INDEX', 'STORE_CODE'])
+	count = activity['invoice_count_ydt']
+	activity['ACTIVITY_LEVEL'] = np.select(
+		[(count >= HIGH_ACTIVITY_FLOOR) & (count >= activity['avg'] + 0.5 * activity['std']), count < activity['avg'] - 0.5 * activity['std']],
+		['High', 'Low'],
+		default='Mid',
+	)
+	activity['DAILY_STORE_INVOICE_COUNT'] = activity['invoice_count_yd']
+	ydtw = ydtw.merge(activity[['CREATED_YEAR', 'DATE_INDEX', 'STORE_CODE', 'TIME_PARTITION', 'ACTIVITY_LEVEL', 'DAILY_STORE_INVOICE_COUNT']],
+		on=['CREATED_YEAR', 'DATE_INDEX', 'STORE_CODE', 'TIME_PARTITION'], how='left')
+
+	frictionless = pd.Series(False, index=ydtw.index)
+	for year, workstations in FRICTIONLESS_WORKSTATIONS.items():
+		frictionless |= (ydtw['CREATED_YEAR'] == year) & ydtw['WORKSTATION'].isin(workstations)
+	ydtw['WORKSTATION_TYPE'] = np.where(frictionless, 'Frictionless', 'Standard')
+	ydtw['STATUS'] = np.where((ydtw['ACTIVITY_LEVEL'] == 'High') & (ydtw['INVOICE_COUNT'] == 0) & ~frictionless, 'Unmanned', 'Manned')
+
+	ydtw = ydtw.sort_values(['CREATED_YEAR', 'DATE_INDEX', 'TIME_PARTITION', 'STORE_CODE', 'WORKSTATION'], ascending=[False, False, False, False, True])
+	return ydtw[list(READ_DTYPES)].reset_index(drop=True)
+
+
+def run_pipeline(invoices, current_year=CURRENT_YEAR):
+	"""The daily extract (same columns as the query's final SELECT) from invoice-level data."""
+	return classify(expand_baseplate(register_volumes(invoice_baskets(invoices)), current_year))
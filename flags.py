@@ -0,0 +1,12 @@
+# Per-row boolean flags derived once after load, shared by every view
+
+
+def derive_flags(data_all):
+	activity_high = (data_all['ACTIVITY_LEVEL'] == 'High').to_numpy(dtype=bool)
+	unmanned = (data_all['STATUS'] == 'Unmanned').to_numpy(dtype=bool)
+
+	data_all['Activity_Level_High'] = activity_high
+	data_all['Unmanned_High'] = activity_high & unmanned # register with no sales in a high-activity period
+	data_all['Frictionless'] = (data_all['WORKSTATION_TYPE'] == 'Frictionless').to_numpy(dtype=bool)
+	data_all['Zero_Volume'] = (data_all['INVOICE_COUNT'] == 0).to_numpy(dtype=bool)
+	return data_all
@@ -0,0 +1,129 @@
+import io
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+
+from cube import select
+from schema import to_time_partition
+
+# The two heatmap views: which cube columns are summed over the selected years, and how they are drawn
+HEATMAP_VIEWS = {
+	'presence': { # years with any register Unmanned_High / in a high-activity period
+		'columns': ['Unmanned_High', 'Activity_Level_High'],
+		'title': 'Total # of Years w/ Unmanned Register for {store_code}',
+		'ylabel': 'CREATED_TIME_PARTITION',
+		'labels': True,
+		'heatmap': {'vmin': 0, 'vmax': 4, 'fmt': ''},
+	},
+	'count': { # registers Unmanned_High / in a high-activity period, over all years
+		'columns': ['Unmanned_High_Count', 'Activity_Level_High_Count'],
+		'title': 'Total Unmanned Registers Count for {store_code}',
+		'ylabel': 'TIME_PARTITION',
+		'labels': False,
+		'heatmap': {},
+	},
+}
+
+# Cache key -> Future of a heatmap being rendered, so sessions and the background warm-up
+# (see precompute.py) asking for the same heatmap share one render
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+def heatmap_grids(unmanned_counts):
+	"""Value, label and mask grids (time partition x date index) for a store heatmap.
+
+	`unmanned_counts` has one row per DATE_INDEX/TIME_SLOT with the Unmanned_High and
+	Activity_Level_High totals. Labels read "unmanned / high-activity", marked with ✖️
+	when the high-activity total ends in 0; cells with "0 / 0" are masked.
+	"""
+	unmanned = unmanned_counts['Unmanned_High'].to_numpy()
+	activity_high = unmanned_counts['Activity_Level_High'].to_numpy()
+
+	labels = np.char.add(np.char.add(unmanned.astype(str), ' / '), activity_high.astype(str))
+	labels = np.char.add(labels, np.where(activity_high % 10 == 0, ' ✖️', ''))
+
+	cells = unmanned_counts[['DATE_INDEX']].assign(
+		TIME_PARTITION=to_time_partition(unmanned_counts['TIME_SLOT']),
+		value=unmanned.astype('float64'),
+		label=labels.astype(object),
+		mask=(unmanned == 0) & (activity_high == 0),
+	)
+	grids = cells.set_index(['TIME_PARTITION', 'DATE_INDEX']).unstack('DATE_INDEX')
+
+	heat_df = grids['value']
+	label_df = grids['label']
+	mask_df = grids['mask'].fillna(True).astype(bool) # cells without data are hidden either way
+	return heat_df, label_df, mask_df
+
+
+def unmanned_counts(cube, view, store_code, years, days):
+	"""Unmanned_High / Activity_Level_High totals per DATE_INDEX and TIME_SLOT for one store."""
+	columns = HEATMAP_VIEWS[view]['columns']
+	counts = select(cube.ydt, store_code, years, days).groupby(level=['DATE_INDEX', 'TIME_SLOT'])[columns].sum().reset_index()
+	counts.columns = ['DATE_INDEX', 'TIME_SLOT', 'Unmanned_High', 'Activity_Level_High']
+	return counts
+
+
+def heatmap_key(view, store_code, years, days, data_hash):
+	return (view, store_code, tuple(sorted(years)), tuple(sorted(days)), data_hash)
+
+
+def render_heatmap(view, store_code, unmanned_counts):
+	"""Render a store heatmap to PNG bytes on its own Figure, leaving no pyplot state behind."""
+	import seaborn as sns # matplotlib and seaborn are only loaded once a heatmap is drawn
+	from matplotlib.figure import Figure
+
+	style = HEATMAP_VIEWS[view]
+	heat_df, label_df, mask_df = heatmap_grids(unmanned_counts)
+
+	fig = Figure(figsize=(13, 7))
+	ax = fig.subplots()
+	annot = label_df.values if style['labels'] else True
+	sns.heatmap(heat_df, cmap='plasma', annot=annot, cbar=False, mask=mask_df, ax=ax, **style['heatmap'])
+
+	ax.set_xlabel('DATE INDEX')
+	ax.set_ylabel(style['ylabel'])
+	ax.set_title(style['title'].format(store_code=store_code))
+
+	image = io.BytesIO()
+	fig.savefig(image, format='png', dpi=200, bbox_inches='tight') # st.pyplot's defaults
+	fig.clear()
+	return image.getvalue()
+
+
+def render_heatmaps(cache, executor, cube, data_hash, view, stores, years, days):
+	"""Yield (store_code, PNG) in store order, serving from `cache` where possible.
+
+	Cache misses are all submitted to `executor` (a process pool) up front so the stores
+	render concurrently; with no executor they are rendered here, one at a time. A heatmap
+	already being rendered for another caller is waited for rather than rendered again.
+	"""
+	keys = [heatmap_key(view, store_code, years, days, data_hash) for store_code in stores]
+	if executor is not None:
+		with _in_flight_lock:
+			for store_code, key in zip(stores, keys):
+				if key not in cache and key not in _in_flight:
+					_in_flight[key] = executor.submit(render_heatmap, view, store_code, unmanned_counts(cube, view, store_code, years, days))
+
+	for store_code, key in zip(stores, keys):
+		heatmap = cache.get(key)
+		if heatmap is None:
+			with _in_flight_lock:
+				future = _in_flight.get(key)
+				rendering_here = future is None
+				if rendering_here:
+					future = _in_flight[key] = Future()
+			if rendering_here:
+				try:
+					future.set_result(render_heatmap(view, store_code, unmanned_counts(cube, view, store_code, years, days)))
+				except Exception as error:
+					future.set_exception(error) # raised below, and in any caller waiting on it
+			try:
+				heatmap = cache.put(key, future.result())
+			finally:
+				with _in_flight_lock:
+					if _in_flight.get(key) is future:
+						del _in_flight[key]
+		yield store_code, heatmap
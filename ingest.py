@@ -0,0 +1,178 @@
+import hashlib
+import io
+
+import pandas as pd
+
+from cube import YDTW_KEYS
+from engine import VOLUME_COLUMNS, VOLUME_KEYS, classify, expand_baseplate, invoice_totals, register_volumes, totals_to_baskets
+from flags import derive_flags
+from merge import last_writer_wins
+from schema import READ_DTYPES, compact, concat_compact, memory_usage
+
+CHUNK_ROWS = 100_000 # rows parsed at a time; only one chunk is ever held with the wide parse types
+
+_SPARSE_DTYPES = {column: READ_DTYPES[column] for column in VOLUME_COLUMNS}
+
+# Accepted file extensions: CSV (plain, gzip or zstd), Parquet and Arrow IPC (file or stream)
+UPLOAD_TYPES = ['csv', 'gz', 'zst', 'parquet', 'arrow', 'feather', 'ipc']
+
+# Leading bytes -> (format, CSV compression)
+_MAGIC = {
+	b'\x1f\x8b': ('csv', 'gzip'),
+	b'\x28\xb5\x2f\xfd': ('csv', 'zstd'),
+	b'PAR1': ('parquet', None),
+	b'ARROW1': ('arrow', None),
+	b'\xff\xff\xff\xff': ('arrow_stream', None),
+}
+
+
+def content_hash(data):
+	return hashlib.sha256(data).hexdigest()
+
+
+def upload_format(data):
+	"""(format, compression) of an upload, from its leading bytes; anything else is taken as plain CSV."""
+	for magic, file_format in _MAGIC.items():
+		if data.startswith(magic):
+			return file_format
+	return 'csv', None
+
+
+def _read_table(data, file_format):
+	"""A Parquet or Arrow IPC upload as a pyarrow Table, reading straight from the uploaded bytes."""
+	import pyarrow as pa
+	import pyarrow.parquet as pq
+
+	buffer = pa.py_buffer(data) # no copy; IPC columns keep pointing into it
+	if file_format == 'parquet':
+		return pq.read_table(buffer)
+	if file_format == 'arrow':
+		return pa.ipc.open_file(buffer).read_all()
+	return pa.ipc.open_stream(buffer).read_all()
+
+
+def _read_chunks(data, progress=None, **options):
+	"""pd.read_csv of `data` in chunks of CHUNK_ROWS rows, passing the share read so far to `progress`."""
+	buffer = io.BytesIO(data)
+	with pd.read_csv(buffer, chunksize=CHUNK_ROWS, **options) as reader:
+		for chunk in reader:
+			yield chunk
+			if progress:
+				progress(min(buffer.tell() / max(len(data), 1), 1.0))
+
+
+def _header(data, compression=None):
+	"""Column names of a CSV upload, upper-cased (DuckDB exports them lower-case)."""
+	return list(pd.read_csv(io.BytesIO(data), nrows=0, compression=compression).columns.str.upper())
+
+
+def read_compact_volumes(data, progress=None, compression=None):
+	"""The query result, each chunk compacted as soon as it is parsed.
+
+	attrs['parsed_bytes'] is what the whole file would have taken with the parse types.
+	"""
+	chunks, parsed_bytes = [], 0
+	for chunk in _read_chunks(data, progress, compression=compression, header=0, names=_header(data, compression), usecols=list(READ_DTYPES), dtype=READ_DTYPES):
+		parsed_bytes += memory_usage(chunk)
+		chunks.append(compact(chunk))
+	volumes = concat_compact(chunks)
+	volumes.attrs['parsed_bytes'] = parsed_bytes
+	return volumes
+
+
+def read_sparse_volumes(data, progress=None, compression=None):
+	return pd.concat(_read_chunks(data, progress, compression=compression, header=0, names=_header(data, compression), usecols=VOLUME_COLUMNS, dtype=_SPARSE_DTYPES), ignore_index=True)
+
+
+def read_invoice_volumes(data, progress=None, compression=None):
+	"""Volumes of invoice-level data; each chunk is reduced to invoice totals before the next is read."""
+	totals = pd.concat(invoice_totals(chunk) for chunk in _read_chunks(data, progress, compression=compression))
+	return register_volumes(totals_to_baskets(totals))
+
+
+def _table_upload(table):
+	"""read_upload for a pyarrow Table; only the columns of the layout are converted to pandas."""
+	table = table.rename_columns([name.upper() for name in table.column_names])
+	if 'INVC_SID' in table.column_names:
+		totals = pd.concat(invoice_totals(batch.to_pandas()) for batch in table.to_batches())
+		return register_volumes(totals_to_baskets(totals)), False
+	if 'ACTIVITY_LEVEL' not in table.column_names:
+		return table.select(VOLUME_COLUMNS).to_pandas().astype(_SPARSE_DTYPES), False
+	raw = table.select(list(READ_DTYPES)).to_pandas(split_blocks=True).astype(READ_DTYPES) # the query's CREATED_YEAR is a string
+	volumes = compact(raw)
+	volumes.attrs['parsed_bytes'] = memory_usage(raw)
+	return volumes, True
+
+
+def read_upload(data, progress=None):
+	"""An upload as (frame, complete), in any of the accepted layouts and formats (see UPLOAD_TYPES).
+
+	- the query result, one row per year/date/time/store/workstation (complete, and compacted)
+	- a sparse extract: the volume columns only, for rows with sales
+	- invoice-level data, reduced here to the same volumes as a sparse extract
+	An incomplete frame still needs its zero rows, activity levels and statuses
+	(expand_baseplate and classify). `progress` is called with the share of the file read.
+	"""
+	file_format, compression = upload_format(data)
+	if file_format != 'csv':
+		upload = _table_upload(_read_table(data, file_format))
+		if progress:
+			progress(1.0)
+		return upload
+
+	columns = _header(data, compression)
+	if 'INVC_SID' in columns:
+		return read_invoice_volumes(data, progress, compression), False
+	if 'ACTIVITY_LEVEL' not in columns:
+		return read_sparse_volumes(data, progress, compression), False
+	return read_compact_volumes(data, progress, compression), True
+
+
+def prepare_extract(raw):
+	"""Compact a parsed extract and add the columns every view relies on."""
+	data_all = derive_flags(compact(raw))
+	data_all.attrs['memory'] = {'parsed_bytes': memory_usage(raw), 'compact_bytes': memory_usage(data_all)}
+	return data_all
+
+
+def prepare_uploads(uploads, progress=None):
+	"""Several uploads ((name, bytes) pairs, in upload order) prepared as one extract.
+
+	A row found in more than one upload is taken from the last of them. Volume uploads (sparse
+	or invoice-level) are merged with each other first and classified together, ranking as the
+	last of them. attrs['conflicts'] lists the rows shared by each pair of uploads (see
+	merge.last_writer_wins).
+	"""
+	total_bytes = sum(len(data) for _, data in uploads) or 1
+	read_bytes, parsed_bytes = 0, 0
+	extracts, volumes = [], []
+	for position, (name, data) in enumerate(uploads):
+		share = None
+		if progress:
+			share = lambda done, read_bytes=read_bytes, size=len(data): progress((read_bytes + done * size) / total_bytes)
+		frame, complete = read_upload(data, share)
+		read_bytes += len(data)
+		if complete:
+			parsed_bytes += frame.attrs.pop('parsed_bytes')
+			extracts.append((position, name, frame))
+		else:
+			volumes.append((position, name, frame))
+
+	conflicts = []
+	if volumes:
+		merged = volumes[0][2]
+		if len(volumes) > 1:
+			merged, conflicts = last_writer_wins([frame for _, _, frame in volumes], [name for _, name, _ in volumes], VOLUME_KEYS)
+		raw = classify(expand_baseplate(merged))
+		parsed_bytes += memory_usage(raw)
+		extracts.append((volumes[-1][0], ", ".join(name for _, name, _ in volumes), compact(raw)))
+		extracts.sort(key=lambda extract: extract[0])
+
+	data_all = extracts[0][2]
+	if len(extracts) > 1:
+		data_all, more = last_writer_wins([frame for _, _, frame in extracts], [name for _, name, _ in extracts], YDTW_KEYS, concat=concat_compact)
+		conflicts += more
+	data_all = derive_flags(data_all)
+	data_all.attrs['memory'] = {'parsed_bytes': parsed_bytes, 'compact_bytes': memory_usage(data_all)}
+	data_all.attrs['conflicts'] = conflicts
+	return data_all
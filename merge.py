@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+# Combining several uploads of the same extract, e.g. one per store or per day
+
+
+def _differs(old, new):
+	if isinstance(old.dtype, pd.CategoricalDtype): # one column of the combined frame, so the same categories
+		old, new = old.cat.codes, new.cat.codes
+	old, new = old.to_numpy(), new.to_numpy()
+	differs = old != new
+	if old.dtype.kind == 'f':
+		differs &= ~(np.isnan(old) & np.isnan(new))
+	return differs
+
+
+def last_writer_wins(frames, names, keys, concat=pd.concat):
+	"""`frames` (in upload order) as one frame, each key keeping the row of the last frame that has it.
+
+	The keys are hashed once for all rows (groupby ngroup) and each row is matched to the last row
+	of its key in a single pass. Returns (merged, conflicts): for each pair of frames sharing keys,
+	{'kept', 'replaced', 'rows', 'differing'} with the frame names, the number of shared rows and
+	how many of those had different values.
+	"""
+	combined = concat([frame.reset_index(drop=True) for frame in frames])
+	combined.index = pd.RangeIndex(len(combined))
+	source = np.repeat(np.arange(len(frames)), [len(frame) for frame in frames])
+	position = np.arange(len(combined))
+
+	group = combined.groupby(keys, sort=False, observed=True).ngroup().to_numpy()
+	last = np.zeros(group.max() + 1 if len(group) else 0, dtype=position.dtype)
+	np.maximum.at(last, group, position)
+	winner = last[group]
+	replaced = winner != position
+	if not replaced.any():
+		return combined, []
+
+	old, new = combined[replaced], combined.iloc[winner[replaced]]
+	differing = np.zeros(len(old), dtype=bool)
+	for column in combined.columns.difference(keys):
+		differing |= _differs(old[column], new[column])
+	names = np.asarray(names, dtype=object)
+	pairs = pd.DataFrame({
+		'kept': names[source[winner[replaced]]],
+		'replaced': names[source[replaced]],
+		'rows': 1,
+		'differing': differing,
+	})
+	conflicts = pairs.groupby(['kept', 'replaced'], sort=False).sum().reset_index()
+	conflicts['differing'] = conflicts['differing'].astype('int64')
+	return combined[~replaced].reset_index(drop=True), conflicts.to_dict('records')
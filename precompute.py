@@ -0,0 +1,31 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from heatmaps import HEATMAP_VIEWS, render_heatmaps
+
+# Rendering every view of an upload on a background thread while its first view is looked at, so
+# switching views is served from the shared caches. The aggregates the views slice are the
+# cube's, built once at ingestion; the heatmaps are the expensive part.
+
+
+def warm_heatmaps(cache, executor, cube, data_hash, stores, years, days):
+	"""Render the heatmaps of every view for `stores` and the given filters into `cache`."""
+	for view in HEATMAP_VIEWS:
+		for _ in render_heatmaps(cache, executor, cube, data_hash, view, stores, years, days):
+			pass
+
+
+class Precompute:
+	"""A background thread running one warm-up per upload (data hash), in start order."""
+
+	def __init__(self):
+		self._executor = ThreadPoolExecutor(1, thread_name_prefix='precompute')
+		self._lock = threading.Lock()
+		self._started = {}
+
+	def start(self, data_hash, task, *args):
+		"""Queue `task(*args)` unless a warm-up for `data_hash` was already started; returns its Future."""
+		with self._lock:
+			if data_hash not in self._started:
+				self._started[data_hash] = self._executor.submit(task, *args)
+			return self._started[data_hash]
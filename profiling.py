@@ -0,0 +1,43 @@
+import cProfile
+import io
+import marshal
+import os
+import pstats
+
+# Opt-in profiling of a view's run, switched on with ?profile=1 in the page URL or PROFILE_VIEWS=1
+# in the server's environment; when off nothing is wrapped. Open a downloaded profile with
+# `python -m pstats view.pstats`, snakeviz, or flameprof for a flame graph.
+
+PROFILE_ENV = 'PROFILE_VIEWS'
+
+
+def _switched_on(value):
+	return str(value).strip().lower() not in ('', '0', 'false', 'no', 'off')
+
+
+def profiling_enabled(query_params):
+	return _switched_on(os.environ.get(PROFILE_ENV, '')) or _switched_on(query_params.get('profile', ''))
+
+
+def profile_call(function, *args, **kwargs):
+	"""(result, profiler) of function(*args, **kwargs) run under cProfile.
+
+	Only the calling thread is profiled: heatmaps rendered in the render pool show as time
+	spent waiting for their results.
+	"""
+	profiler = cProfile.Profile()
+	result = profiler.runcall(function, *args, **kwargs)
+	profiler.create_stats()
+	return result, profiler
+
+
+def pstats_bytes(profiler):
+	"""The profile as a .pstats file (what Profile.dump_stats writes)."""
+	return marshal.dumps(profiler.stats)
+
+
+def top_functions(profiler, limit=30, sort='cumulative'):
+	"""The `limit` most expensive functions, as `python -m pstats` prints them."""
+	report = io.StringIO()
+	pstats.Stats(profiler, stream=report).strip_dirs().sort_stats(sort).print_stats(limit)
+	return report.getvalue()
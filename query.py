@@ -0,0 +1,446 @@
+from datetime import date, datetime, time, timedelta
+
+from config import CURRENT_YEAR, ELAPSED_TIME_CAP, FRICTIONLESS_WORKSTATIONS, HIGH_ACTIVITY_FLOOR, OPENING_HOURS, STORES, TOURNAMENTS
+
+# Builds the daily extract query for any set of stores and years. All stores are read from
+# cms.invoice_v / cms.store_v / cms.invc_item_v in a single scan and kept apart by store_code.
+
+
+# Oracle for the query run by hand; DuckDB for running the same query locally
+DIALECTS = {
+	'oracle': {
+		'year': "TO_CHAR({0}, 'YYYY')",
+		'hour': "TO_NUMBER(TO_CHAR({0}, 'HH24'))",
+		'minute': "TO_NUMBER(TO_CHAR({0}, 'MI'))",
+		'clock': "TO_CHAR({0}, 'HH24:MI')",
+		'day': "TRUNC({0})",
+		'date': "TO_DATE('{0}', 'yyyy-mm-dd')",
+		'datetime': "TO_DATE('{0}', 'yyyy-mm-dd hh24:mi:ss')",
+		'stddev': "STDDEV({0}){1}",
+	},
+	'duckdb': {
+		'year': "strftime({0}, '%Y')",
+		'hour': "hour({0})",
+		'minute': "minute({0})",
+		'clock': "strftime({0}, '%H:%M')",
+		'day': "CAST({0} AS DATE)",
+		'date': "DATE '{0}'",
+		'datetime': "TIMESTAMP '{0}'",
+		'stddev': "COALESCE(STDDEV_SAMP({0}){1}, 0)", # NULL for a single row, where Oracle gives 0
+	},
+}
+
+
+def _quote(value):
+	return "'" + str(value).replace("'", "''") + "'"
+
+
+def _lines(rows, indent):
+	return "\n".join("\t" * indent + row for row in rows)
+
+
+def _opening_ranges(tournaments, opening_hours):
+	"""[start, end) of the opening hours of every extracted day."""
+	opens, closes = (time.fromisoformat(hhmi) for hhmi in opening_hours)
+	for dates in tournaments.values():
+		day, extract_to = date.fromisoformat(dates['extract_from']), date.fromisoformat(dates['extract_to'])
+		while day <= extract_to:
+			start = datetime.combine(day, opens)
+			# HH24:MI BETWEEN keeps the whole closing minute; the extract ends at midnight starting extract_to
+			end = min(datetime.combine(day, closes) + timedelta(minutes=1), datetime.combine(extract_to, time()) + timedelta(seconds=1))
+			if start < end:
+				yield start, end
+			day += timedelta(days=1)
+
+
+def _invoice_all(stores, tournaments, elapsed_time_cap, opening_hours, sql, windowed):
+	created = 'inv.created_date'
+	store_codes = _lines([f"WHEN {_quote(name)} THEN {_quote(code)}" for code, name in stores.items()], 4)
+	date_indexes = _lines([
+		f"WHEN {sql['year'].format(created)} = '{year}' THEN ({sql['day'].format(created)} - {sql['date'].format(dates['main_draw_start'])})"
+		for year, dates in tournaments.items()
+	], 4)
+	if windowed:
+		# plain ranges on created_date, one per opening day, so an index on it can be used
+		date_ranges = _lines([
+			("OR " if i else "") + f"({created} >= {sql['datetime'].format(start)} AND {created} < {sql['datetime'].format(end)})"
+			for i, (start, end) in enumerate(_opening_ranges(tournaments, opening_hours))
+		], 4)
+		opening_filter = ""
+	else:
+		date_ranges = _lines([
+			("OR " if i else "") + f"({created} >= {sql['date'].format(dates['extract_from'])} AND {created} <= {sql['date'].format(dates['extract_to'])})"
+			for i, dates in enumerate(tournaments.values())
+		], 4)
+		opening_filter = f"\n\t\t\tAND {sql['clock'].format(created)} BETWEEN '{opening_hours[0]}' AND '{opening_hours[1]}'"
+	store_names = ", ".join(_quote(name) for name in stores.values())
+
+	return f"""\
+	-- invoice-level information (store, year, date index, time partition, workstation, elapsed time, basket size and amount)
+	-- for non-cancelled, regular sales invoices within opening hours, for every store in one pass over the invoice tables
+	invoice_all AS (
+		SELECT
+			inv.invc_sid,
+			CASE str.store_name
+{store_codes}
+				END AS store_code,
+			{sql['year'].format(created)} AS created_year,
+			CASE
+{date_indexes}
+				END AS date_index,
+			CASE
+				WHEN {sql['minute'].format(created)} > 30
+				THEN {sql['hour'].format(created)} + 0.5
+				ELSE {sql['hour'].format(created)}
+				END AS time_partition,
+			inv.workstation,
+			LEAST(inv.elapsed_time, {elapsed_time_cap}) AS elapsed_time,
+			SUM(item.qty) AS basket_size,
+			SUM((COALESCE(item.price, item.orig_price) + COALESCE(item.tax_amt, item.orig_tax_amt)) * item.qty) AS basket_amt
+		FROM cms.invoice_v inv
+		INNER JOIN cms.store_v str
+			ON inv.store_no = str.store_no
+			AND inv.sbs_no = str.sbs_no
+		LEFT JOIN cms.invc_item_v item
+			ON inv.invc_sid = item.invc_sid
+		WHERE 1=1
+			AND str.store_name IN ({store_names})
+			AND (
+{date_ranges}
+				){opening_filter}
+			AND inv.invc_type = 0	-- standard sales invoices
+			AND inv.status = 0	-- non-cancelled invoices
+		GROUP BY
+			inv.invc_sid,
+			str.store_name,
+			inv.created_date,
+			inv.workstation,
+			inv.elapsed_time
+		HAVING SUM(item.qty) > 0	-- remove strange return/exchange invoices that persist
+	)"""
+
+
+def _register_volumes_ydtw(current_year):
+	return f"""\
+	-- the baseplate: per store, every year crossed with the dates and time partitions seen in any year and the
+	-- workstations seen in that year; in {current_year} dates stop at the latest day, which only gets the time partitions seen so far
+	years AS (SELECT DISTINCT store_code, created_year FROM invoice_all),
+	dates AS (SELECT DISTINCT store_code, date_index FROM invoice_all),
+	times AS (SELECT DISTINCT store_code, time_partition FROM invoice_all),
+	workstations AS (SELECT DISTINCT store_code, created_year, workstation FROM invoice_all),
+	current_day AS (
+		SELECT store_code, MAX(date_index) AS date_index
+		FROM invoice_all
+		WHERE created_year = '{current_year}'
+		GROUP BY store_code
+	),
+	current_times AS (
+		SELECT DISTINCT inv.store_code, inv.time_partition
+		FROM invoice_all inv
+		INNER JOIN current_day cd
+			ON inv.store_code = cd.store_code
+			AND inv.date_index = cd.date_index
+		WHERE inv.created_year = '{current_year}'
+	),
+	baseplate AS (
+		SELECT y.store_code, y.created_year, d.date_index, t.time_partition, w.workstation	-- prior years
+		FROM years y
+		INNER JOIN dates d ON d.store_code = y.store_code
+		INNER JOIN times t ON t.store_code = y.store_code
+		INNER JOIN workstations w ON w.store_code = y.store_code AND w.created_year = y.created_year
+		WHERE y.created_year <> '{current_year}'
+		UNION ALL
+		SELECT y.store_code, y.created_year, d.date_index, t.time_partition, w.workstation	-- {current_year} prior days
+		FROM years y
+		INNER JOIN current_day cd ON cd.store_code = y.store_code
+		INNER JOIN dates d ON d.store_code = y.store_code AND d.date_index < cd.date_index
+		INNER JOIN times t ON t.store_code = y.store_code
+		INNER JOIN workstations w ON w.store_code = y.store_code AND w.created_year = y.created_year
+		WHERE y.created_year = '{current_year}'
+		UNION ALL
+		SELECT y.store_code, y.created_year, cd.date_index, ct.time_partition, w.workstation	-- {current_year} current day
+		FROM years y
+		INNER JOIN current_day cd ON cd.store_code = y.store_code
+		INNER JOIN current_times ct ON ct.store_code = y.store_code
+		INNER JOIN workstations w ON w.store_code = y.store_code AND w.created_year = y.created_year
+		WHERE y.created_year = '{current_year}'
+	),
+	-- the below contains register volumes by year/date/time/workstation
+	register_volumes_ydtw AS (
+		SELECT
+			b.created_year,
+			b.date_index,
+			b.time_partition,
+			b.store_code,
+			b.workstation,
+			COUNT(inv_a.invc_sid) AS invoice_count_ydtw,
+			CASE WHEN SUM(inv_a.elapsed_time) IS NOT NULL THEN SUM(inv_a.elapsed_time) ELSE 0 END AS elapsed_time_ydtw,
+			CASE WHEN SUM(inv_a.basket_size) IS NOT NULL THEN SUM(inv_a.basket_size) ELSE 0 END AS qty_items_ydtw,
+			CASE WHEN SUM(inv_a.basket_amt) IS NOT NULL THEN SUM(inv_a.basket_amt) ELSE 0 END AS sales_ydtw
+		FROM baseplate b
+		LEFT JOIN invoice_all inv_a
+			ON inv_a.store_code = b.store_code
+			AND inv_a.created_year = b.created_year
+			AND inv_a.date_index = b.date_index
+			AND inv_a.time_partition = b.time_partition
+			AND inv_a.workstation = b.workstation
+		GROUP BY
+			b.created_year,
+			b.date_index,
+			b.time_partition,
+			b.store_code,
+			b.workstation
+	)"""
+
+
+def _frictionless(frictionless_workstations, alias):
+	conditions = [
+		f"({alias}.workstation IN ({', '.join(map(str, workstations))}) AND {alias}.created_year = '{year}')"
+		for year, workstations in frictionless_workstations.items() if workstations
+	]
+	return " OR ".join(conditions) or "1=0"
+
+
+def _register_volumes_ydt():
+	return """\
+	-- the below contains register volumes by year/date/time
+	register_volumes_ydt AS (
+		SELECT
+			ydtw.created_year,
+			ydtw.date_index,
+			ydtw.time_partition,
+			ydtw.store_code,
+			SUM(ydtw.invoice_count_ydtw) AS invoice_count_ydt,
+			SUM(ydtw.elapsed_time_ydtw) AS elapsed_time_ydt,
+			SUM(ydtw.qty_items_ydtw) AS qty_items_ydt,
+			SUM(ydtw.sales_ydtw) AS sales_ydt
+		FROM register_volumes_ydtw ydtw
+		GROUP BY
+			ydtw.created_year,
+			ydtw.date_index,
+			ydtw.store_code,
+			ydtw.time_partition
+	)"""
+
+
+def _activity_levels(high_activity_floor, sql):
+	stddev = sql['stddev'].format('ydt.invoice_count_ydt', '')
+	return f"""\
+	-- the below contains register volumes by year/date
+	register_volumes_yd AS (
+		SELECT
+			ydt.created_year,
+			ydt.date_index,
+			ydt.store_code,
+			SUM(ydt.invoice_count_ydt) AS invoice_count_yd,
+			SUM(ydt.elapsed_time_ydt) AS elapsed_time_yd,
+			SUM(ydt.qty_items_ydt) AS qty_items_yd,
+			SUM(ydt.sales_ydt) AS sales_yd,
+			AVG(ydt.invoice_count_ydt) AS avg_invoice_count_per_time,
+			{stddev} AS std_invoice_count_across_times,
+			AVG(ydt.invoice_count_ydt) - 0.5*{stddev} AS activity_level_cutoff_low,
+			AVG(ydt.invoice_count_ydt) + 0.5*{stddev} AS activity_level_cutoff_high
+		FROM register_volumes_ydt ydt
+		GROUP BY
+			ydt.created_year,
+			ydt.date_index,
+			ydt.store_code
+	),
+	-- the below contains Activity Level classifications by year/date/time
+	activity_levels AS (
+		SELECT
+			ydt.created_year,
+			ydt.date_index,
+			ydt.time_partition,
+			ydt.store_code,
+			CASE
+				WHEN ydt.invoice_count_ydt >= {high_activity_floor} AND ydt.invoice_count_ydt >= yd.activity_level_cutoff_high
+					THEN 'High'
+				WHEN ydt.invoice_count_ydt < yd.activity_level_cutoff_low
+					THEN 'Low'
+				ELSE 'Mid'
+				END AS activity_level
+		FROM register_volumes_ydt ydt
+		LEFT JOIN register_volumes_yd yd
+			ON ydt.created_year = yd.created_year
+			AND ydt.date_index = yd.date_index
+			AND ydt.store_code = yd.store_code
+	)"""
+
+
+def _windowed_activity_levels(high_activity_floor, sql):
+	day = " OVER (PARTITION BY ydt.created_year, ydt.date_index, ydt.store_code)"
+	stddev = sql['stddev'].format('ydt.invoice_count_ydt', day)
+	return f"""\
+	-- the below adds the daily store totals and Activity Level cutoffs to every year/date/time, without a separate daily table
+	daily_cutoffs AS (
+		SELECT
+			ydt.created_year,
+			ydt.date_index,
+			ydt.time_partition,
+			ydt.store_code,
+			ydt.invoice_count_ydt,
+			SUM(ydt.invoice_count_ydt){day} AS invoice_count_yd,
+			AVG(ydt.invoice_count_ydt){day} - 0.5*{stddev} AS activity_level_cutoff_low,
+			AVG(ydt.invoice_count_ydt){day} + 0.5*{stddev} AS activity_level_cutoff_high
+		FROM register_volumes_ydt ydt
+	),
+	-- the below contains Activity Level classifications by year/date/time
+	activity_levels AS (
+		SELECT
+			dc.created_year,
+			dc.date_index,
+			dc.time_partition,
+			dc.store_code,
+			CASE
+				WHEN dc.invoice_count_ydt >= {high_activity_floor} AND dc.invoice_count_ydt >= dc.activity_level_cutoff_high
+					THEN 'High'
+				WHEN dc.invoice_count_ydt < dc.activity_level_cutoff_low
+					THEN 'Low'
+				ELSE 'Mid'
+				END AS activity_level,
+			dc.invoice_count_yd
+		FROM daily_cutoffs dc
+	)"""
+
+
+def _master(frictionless_workstations, windowed):
+	frictionless = _frictionless(frictionless_workstations, 'ydtw')
+	daily_total = ",\n\t\t\tal.invoice_count_yd" if windowed else ""
+	return f"""\
+	-- the below contains Manned/Unmanned status by year/date/time/workstation
+	master AS (
+		SELECT
+			ydtw.created_year,
+			ydtw.date_index,
+			ydtw.time_partition,
+			ydtw.store_code,
+			ydtw.workstation,
+			CASE
+				WHEN {frictionless}
+					THEN 'Frictionless'
+				ELSE 'Standard'
+				END AS workstation_type,
+			ydtw.invoice_count_ydtw,
+			ydtw.elapsed_time_ydtw,
+			ydtw.qty_items_ydtw,
+			ydtw.sales_ydtw,
+			al.activity_level,
+			CASE
+				WHEN al.activity_level = 'High' AND ydtw.invoice_count_ydtw = 0 AND NOT ({frictionless})
+					THEN 'Unmanned'
+				ELSE 'Manned' END AS status{daily_total}
+		FROM register_volumes_ydtw ydtw
+		LEFT JOIN activity_levels al
+			ON ydtw.created_year = al.created_year
+			AND ydtw.date_index = al.date_index
+			AND ydtw.time_partition = al.time_partition
+			AND ydtw.store_code = al.store_code
+	)"""
+
+
+_FINAL_SELECT = """\
+SELECT
+	m.created_year,
+	m.date_index,
+	m.time_partition,
+	m.store_code,
+	m.workstation,
+	m.workstation_type,
+	m.invoice_count_ydtw AS invoice_count,
+	m.elapsed_time_ydtw AS transactions_time,
+	m.qty_items_ydtw AS qty_items_sold,
+	m.sales_ydtw AS total_sales,
+	m.activity_level,
+	m.status,
+	yd.invoice_count_yd AS daily_store_invoice_count
+FROM master m
+LEFT JOIN register_volumes_yd yd
+	ON m.created_year = yd.created_year
+	AND m.date_index = yd.date_index
+	AND m.store_code = yd.store_code
+{where}ORDER BY
+	created_year DESC,
+	date_index DESC,
+	time_partition DESC,
+	store_code DESC,
+	workstation ASC"""
+
+# The daily total is already on master
+_WINDOWED_SELECT = """\
+SELECT
+	m.created_year,
+	m.date_index,
+	m.time_partition,
+	m.store_code,
+	m.workstation,
+	m.workstation_type,
+	m.invoice_count_ydtw AS invoice_count,
+	m.elapsed_time_ydtw AS transactions_time,
+	m.qty_items_ydtw AS qty_items_sold,
+	m.sales_ydtw AS total_sales,
+	m.activity_level,
+	m.status,
+	m.invoice_count_yd AS daily_store_invoice_count
+FROM master m
+{where}ORDER BY
+	created_year DESC,
+	date_index DESC,
+	time_partition DESC,
+	store_code DESC,
+	workstation ASC"""
+
+# Only the rows with sales; the app rebuilds the zero rows, activity levels and statuses itself
+_SPARSE_SELECT = """\
+SELECT
+	inv.created_year,
+	inv.date_index,
+	inv.time_partition,
+	inv.store_code,
+	inv.workstation,
+	COUNT(inv.invc_sid) AS invoice_count,
+	COALESCE(SUM(inv.elapsed_time), 0) AS transactions_time,
+	COALESCE(SUM(inv.basket_size), 0) AS qty_items_sold,
+	COALESCE(SUM(inv.basket_amt), 0) AS total_sales
+FROM invoice_all inv
+GROUP BY
+	inv.created_year,
+	inv.date_index,
+	inv.time_partition,
+	inv.store_code,
+	inv.workstation
+ORDER BY
+	created_year DESC,
+	date_index DESC,
+	time_partition DESC,
+	store_code DESC,
+	workstation ASC"""
+
+
+def extract_query(stores=STORES, tournaments=TOURNAMENTS, elapsed_time_cap=ELAPSED_TIME_CAP, current_year=CURRENT_YEAR,
+		opening_hours=OPENING_HOURS, high_activity_floor=HIGH_ACTIVITY_FLOOR, frictionless_workstations=FRICTIONLESS_WORKSTATIONS,
+		sparse=False, windowed=False, dialect='oracle', only_year=None):
+	"""The daily extract query.
+
+	`stores` maps store codes to cms.store_v store names and `tournaments` maps years to their
+	main-draw start and extract date range (see config.py). With `sparse`, only the volumes of
+	the year/date/time/store/workstation combinations with sales are returned. With `windowed`,
+	invoices are filtered on created_date ranges and the daily totals and Activity Level cutoffs
+	are analytic functions over the year/date/time volumes instead of a joined daily table.
+	`dialect` is one of DIALECTS. With `only_year`, only that year's rows are returned, for a
+	daily upload into the local dataset; a sparse query then only reads that year's invoices.
+	"""
+	sql = DIALECTS[dialect]
+	if sparse and only_year is not None:
+		tournaments = {only_year: tournaments[only_year]} # the other years' zero rows come from the dataset
+	ctes = [_invoice_all(stores, tournaments, elapsed_time_cap, opening_hours, sql, windowed)]
+	if sparse:
+		return "WITH\n" + ",\n".join(ctes) + "\n" + _SPARSE_SELECT
+	ctes += [
+		_register_volumes_ydtw(current_year),
+		_register_volumes_ydt(),
+		(_windowed_activity_levels if windowed else _activity_levels)(high_activity_floor, sql),
+		_master(frictionless_workstations, windowed),
+	]
+	where = f"WHERE m.created_year = '{only_year}'\n" if only_year is not None else ""
+	return "WITH\n" + ",\n".join(ctes) + "\n" + (_WINDOWED_SELECT if windowed else _FINAL_SELECT).format(where=where)
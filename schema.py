@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Columns of the final SELECT in the daily extract query, with the types they are parsed as
+READ_DTYPES = {
+	'CREATED_YEAR': 'int64',
+	'DATE_INDEX': 'int64',
+	'TIME_PARTITION': 'float64',
+	'STORE_CODE': str,
+	'WORKSTATION': 'int64',
+	'WORKSTATION_TYPE': str,
+	'INVOICE_COUNT': 'int64',
+	'TRANSACTIONS_TIME': 'float64',
+	'QTY_ITEMS_SOLD': 'float64',
+	'TOTAL_SALES': 'float64',
+	'ACTIVITY_LEVEL': str,
+	'STATUS': str,
+	'DAILY_STORE_INVOICE_COUNT': 'int64',
+}
+
+# ... and the types they are held in once loaded. TIME_PARTITION (10, 10.5, ..., 22) is replaced
+# by TIME_SLOT, the index of the half hour in the day (20, 21, ..., 44).
+COMPACT_DTYPES = {
+	'CREATED_YEAR': 'int16',
+	'DATE_INDEX': 'int8',
+	'TIME_SLOT': 'int8',
+	'STORE_CODE': 'category',
+	'WORKSTATION': 'int16',
+	'WORKSTATION_TYPE': 'category',
+	'INVOICE_COUNT': 'int32',
+	'TRANSACTIONS_TIME': 'float32',
+	'QTY_ITEMS_SOLD': 'float32',
+	'TOTAL_SALES': 'float32',
+	'ACTIVITY_LEVEL': 'category',
+	'STATUS': 'category',
+	'DAILY_STORE_INVOICE_COUNT': 'int32',
+}
+
+
+def to_time_slot(time_partition):
+	return (np.asarray(time_partition, dtype='float64') * 2).round().astype('int8')
+
+
+def to_time_partition(time_slot):
+	return np.asarray(time_slot, dtype='float64') / 2
+
+
+def memory_usage(df):
+	return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _narrow(values, column, dtype):
+	if np.issubdtype(np.dtype(dtype), np.integer) and len(values):
+		bounds = np.iinfo(dtype)
+		if values.min() < bounds.min or values.max() > bounds.max:
+			raise ValueError(f"{column} has values outside the {dtype} range")
+	return values.astype(dtype)
+
+
+def compact(df):
+	"""Cast a frame read with READ_DTYPES to COMPACT_DTYPES."""
+	columns = {}
+	for column, dtype in COMPACT_DTYPES.items():
+		if column == 'TIME_SLOT':
+			columns[column] = to_time_slot(df['TIME_PARTITION'])
+		elif dtype == 'category':
+			columns[column] = df[column].astype('category')
+		else:
+			columns[column] = _narrow(df[column], column, dtype)
+	return pd.DataFrame(columns, index=df.index)
+
+
+def concat_compact(frames):
+	"""Concatenate compacted frames; categorical columns stay categorical (with the union of the categories)."""
+	first = frames[0]
+	columns = {}
+	for column in first.columns:
+		if isinstance(first[column].dtype, pd.CategoricalDtype):
+			columns[column] = union_categoricals([frame[column] for frame in frames])
+		else:
+			columns[column] = np.concatenate([frame[column].to_numpy() for frame in frames])
+	return pd.DataFrame(columns, copy=False)
@@ -0,0 +1,104 @@
+import argparse
+import hashlib
+import os
+
+import pandas as pd
+
+from query import extract_query
+from schema import READ_DTYPES
+
+# Local Parquet copies of the cms tables read by the extract query. The query runs on them with
+# DuckDB (pip install duckdb pyarrow), on every core, instead of by hand on the production database.
+
+SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR', 'snapshots')
+
+# Table -> the columns the query uses; nothing else is kept
+SNAPSHOT_COLUMNS = {
+	'invoice_v': ['invc_sid', 'created_date', 'sbs_no', 'store_no', 'workstation', 'elapsed_time', 'invc_type', 'status'],
+	'store_v': ['store_no', 'sbs_no', 'store_name'],
+	'invc_item_v': ['invc_sid', 'qty', 'price', 'orig_price', 'tax_amt', 'orig_tax_amt'],
+}
+
+
+def snapshot_paths(directory=SNAPSHOT_DIR):
+	return {table: os.path.join(directory, f'{table}.parquet') for table in SNAPSHOT_COLUMNS}
+
+
+def has_snapshot(directory=SNAPSHOT_DIR):
+	return all(os.path.exists(path) for path in snapshot_paths(directory).values())
+
+
+def snapshot_version(directory=SNAPSHOT_DIR):
+	"""Changes whenever a snapshot file is rewritten; used as the cache key of its extract."""
+	files = sorted((table, os.stat(path).st_size, os.stat(path).st_mtime_ns) for table, path in snapshot_paths(directory).items())
+	return hashlib.sha256(repr(files).encode()).hexdigest()
+
+
+def write_snapshot(tables, directory=SNAPSHOT_DIR):
+	"""Save `tables` (table name -> frame, as exported from cms) as the snapshot in `directory`."""
+	os.makedirs(directory, exist_ok=True)
+	for table, path in snapshot_paths(directory).items():
+		frame = tables[table].rename(columns=str.lower)[SNAPSHOT_COLUMNS[table]]
+		if table == 'invoice_v':
+			frame = frame.sort_values('created_date') # row groups outside the extract dates are skipped
+		frame.to_parquet(path + '.tmp', index=False)
+		os.replace(path + '.tmp', path) # a running query never sees a half-written file
+
+
+def connect(directory=SNAPSHOT_DIR, threads=None):
+	"""DuckDB connection with the snapshot as cms.invoice_v, cms.store_v and cms.invc_item_v."""
+	import duckdb
+
+	con = duckdb.connect()
+	if threads:
+		con.execute(f"SET threads = {int(threads)}")
+	con.execute("CREATE SCHEMA cms")
+	for table, path in snapshot_paths(directory).items():
+		path = path.replace("'", "''")
+		con.execute(f"CREATE VIEW cms.{table} AS SELECT * FROM read_parquet('{path}')")
+	return con
+
+
+def connect_frames(invoice_v, store_v, invc_item_v):
+	"""DuckDB connection with in-memory frames (e.g. synthetic.invoice_tables) as the cms tables."""
+	import duckdb
+
+	con = duckdb.connect()
+	con.execute("CREATE SCHEMA cms")
+	for table, frame in zip(SNAPSHOT_COLUMNS, (invoice_v, store_v, invc_item_v)):
+		con.register(f'{table}_frame', frame)
+		con.execute(f"CREATE TABLE cms.{table} AS SELECT * FROM {table}_frame")
+	return con
+
+
+def run_extract(directory=SNAPSHOT_DIR, windowed=True, threads=None):
+	"""The daily extract (the query's final SELECT, parsed as READ_DTYPES) from the snapshot."""
+	con = connect(directory, threads)
+	try:
+		extract = con.execute(extract_query(dialect='duckdb', windowed=windowed)).df()
+	finally:
+		con.close()
+	extract.columns = extract.columns.str.upper()
+	return extract.astype(READ_DTYPES)
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Write a local snapshot of the cms tables.")
+	parser.add_argument('--directory', default=SNAPSHOT_DIR)
+	source = parser.add_mutually_exclusive_group(required=True)
+	source.add_argument('--from-csv', metavar='DIR', help="directory with invoice_v.csv, store_v.csv and invc_item_v.csv exports")
+	source.add_argument('--synthetic', type=int, metavar='INVOICES_PER_DAY', help="made-up data, for trying the app offline")
+	args = parser.parse_args()
+
+	if args.synthetic:
+		from synthetic import invoice_tables
+		tables = dict(zip(SNAPSHOT_COLUMNS, invoice_tables(args.synthetic)))
+	else:
+		tables = {table: pd.read_csv(os.path.join(args.from_csv, f'{table}.csv')).rename(columns=str.lower) for table in SNAPSHOT_COLUMNS}
+		tables['invoice_v']['created_date'] = pd.to_datetime(tables['invoice_v']['created_date'])
+	write_snapshot(tables, args.directory)
+	print(f"{len(tables['invoice_v']):,} invoices written to {args.directory}")
+
+
+if __name__ == '__main__':
+	main()
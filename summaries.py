@@ -0,0 +1,89 @@
+import pandas as pd
+
+from cube import YD_KEYS
+from schema import memory_usage
+
+# Summary tables of the daily check, for every store/year/date index at once from the cube's grains
+
+YDW_KEYS = YD_KEYS + ['WORKSTATION']
+
+
+def _time_partitions(cube):
+	"""Time partitions per store/year/date index (the last day of the current year has fewer)."""
+	return cube.ydt.groupby(level=YD_KEYS, observed=True).size()
+
+
+def register_summary(cube):
+	"""One row per store/year/date index/workstation: the Breakdown view's register statistics.
+
+	Per-period figures divide by the day's actual number of time partitions; a register with
+	every period Unmanned_High has no manned-period figure (NaN).
+	"""
+	rows = cube.ydtw
+	invoices, unmanned, high = rows['INVOICE_COUNT'], rows['Unmanned_High'], rows['Activity_Level_High']
+	summary = pd.DataFrame({
+		'INVOICES': invoices,
+		'MANNED_INVOICES': invoices.where(~unmanned, 0),
+		'HIGH_ACTIVITY_INVOICES': invoices.where(high, 0),
+		'UNMANNED_HIGH_PERIODS': unmanned,
+		'HIGH_ACTIVITY_PERIODS': high,
+	}).groupby(level=YDW_KEYS, observed=True).sum()
+
+	periods = _time_partitions(cube).reindex(summary.index.droplevel('WORKSTATION')).to_numpy()
+	manned_periods = periods - summary['UNMANNED_HIGH_PERIODS']
+	summary['TIME_PARTITIONS'] = periods
+	summary['INVOICES_PER_PERIOD'] = summary['INVOICES'] / periods
+	summary['INVOICES_PER_MANNED_PERIOD'] = summary['MANNED_INVOICES'] / manned_periods.where(manned_periods > 0)
+	summary['INVOICES_PER_HIGH_PERIOD'] = summary['HIGH_ACTIVITY_INVOICES'] / summary['HIGH_ACTIVITY_PERIODS'].where(summary['HIGH_ACTIVITY_PERIODS'] > 0)
+	summary['UNMANNED_PERCENT'] = summary['UNMANNED_HIGH_PERIODS'] / periods * 100
+	return summary.reset_index()
+
+
+def store_day_summary(cube, registers=None):
+	"""One row per store/year/date index: the Breakdown view's store summary.
+
+	The mean and standard deviation are of the store invoices per time partition, and the
+	cutoffs are the mean -/+ half a standard deviation, as drawn on the Store Activity chart.
+	The register averages are over `registers` (register_summary, computed if not given).
+	"""
+	if registers is None:
+		registers = register_summary(cube)
+	by_register = registers.groupby(YD_KEYS, observed=True)
+	by_day = cube.ydt.groupby(level=YD_KEYS, observed=True)
+	invoices = by_day['INVOICE_COUNT']
+	summary = pd.DataFrame({
+		'TRANSACTIONS': cube.yd['DAILY_STORE_INVOICE_COUNT'],
+		'REGISTERS': by_register.size(),
+		'TIME_PARTITIONS': invoices.size(),
+		'MEAN_PER_PERIOD': invoices.mean(),
+		'STD_PER_PERIOD': invoices.std(),
+		'HIGH_ACTIVITY_PERIODS': by_day['Activity_Level_High'].sum(),
+		'UNMANNED_HIGH_PERIODS': by_day['Unmanned_High_Count'].sum(), # register-periods
+	})
+	summary['LOW_CUTOFF'] = summary['MEAN_PER_PERIOD'] - 0.5 * summary['STD_PER_PERIOD']
+	summary['HIGH_CUTOFF'] = summary['MEAN_PER_PERIOD'] + 0.5 * summary['STD_PER_PERIOD']
+
+	register_means = by_register[['INVOICES', 'INVOICES_PER_PERIOD', 'INVOICES_PER_MANNED_PERIOD', 'UNMANNED_HIGH_PERIODS', 'UNMANNED_PERCENT']].mean()
+	summary = summary.join(register_means.add_prefix('REGISTER_AVG_'))
+	summary['REGISTER_STD_UNMANNED_HIGH_PERIODS'] = by_register['UNMANNED_HIGH_PERIODS'].std()
+
+	# invoices per register in the high-activity periods, and per register not Unmanned_High then
+	high = cube.ydt[cube.ydt['Activity_Level_High']]
+	day_registers = summary['REGISTERS'].reindex(high.index.droplevel('TIME_SLOT')).to_numpy()
+	manned_registers = day_registers - high['Unmanned_High_Count']
+	per_register = pd.DataFrame({
+		'HIGH_PERIOD_INVOICES_PER_REGISTER': high['INVOICE_COUNT'] / day_registers,
+		'HIGH_PERIOD_INVOICES_PER_MANNED_REGISTER': high['INVOICE_COUNT'] / manned_registers.where(manned_registers > 0),
+	}).groupby(level=YD_KEYS, observed=True).mean()
+	return summary.join(per_register).reset_index()
+
+
+def daily_summaries(cube):
+	"""(store_day_summary, register_summary) of a cube."""
+	registers = register_summary(cube)
+	return store_day_summary(cube, registers), registers
+
+
+def summary_bytes(summaries):
+	"""Size of a (store_days, registers) pair, for the app's summary cache."""
+	return sum(memory_usage(frame) for frame in summaries)
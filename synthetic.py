@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+from config import CURRENT_YEAR, FRICTIONLESS_WORKSTATIONS, OPENING_HOURS, STORES, TOURNAMENTS
+from engine import VOLUME_KEYS, classify
+
+# Made-up cms.invoice_v / cms.store_v / cms.invc_item_v tables shaped like the tournament data,
+# for running the extract query and the local pipeline without the production database, and
+# made-up extracts (the query's result) at any scale, for timing the app without one.
+
+WORKSTATIONS = {'11G': 12, 'S2': 6, 'OCT': 8, '22B': 5} # registers per store (others get 6)
+
+
+def invoice_tables(invoices_per_day=500, current_day=5, seed=0):
+	"""(invoice_v, store_v, invc_item_v) for every store in config.py and one store outside the tournament.
+
+	Each store sells about `invoices_per_day` invoices a day from a day before to a day after each
+	extract range, busiest in the early afternoon, with a few returns and cancelled invoices. The
+	CURRENT_YEAR data stops mid-afternoon on date index `current_day`.
+	"""
+	rng = np.random.default_rng(seed)
+	stores = list(STORES) + ['XX']
+	store_v = pd.DataFrame({
+		'store_no': np.arange(1, len(stores) + 1),
+		'sbs_no': 1,
+		'store_name': [STORES.get(code, 'Other store') for code in stores],
+	})
+
+	invoices = []
+	for store_no, code in enumerate(stores, start=1):
+		registers = np.arange(1, WORKSTATIONS.get(code, 6) + 1)
+		for year, dates in TOURNAMENTS.items():
+			days = pd.date_range(pd.Timestamp(dates['extract_from']) - pd.Timedelta(days=1), pd.Timestamp(dates['extract_to']) + pd.Timedelta(days=1))
+			counts = rng.poisson(invoices_per_day * rng.uniform(0.3, 1.7, size=len(days)))
+			day = np.repeat(days.to_numpy(), counts)
+			seconds = np.where(rng.random(len(day)) < 0.4, rng.normal(14 * 3600, 3600, size=len(day)), rng.uniform(9 * 3600, 23 * 3600, size=len(day)))
+			created = day + pd.to_timedelta(seconds.clip(0, 86399).astype('int64'), unit='s').to_numpy()
+			workstations = np.append(registers, FRICTIONLESS_WORKSTATIONS.get(year, []))
+			frame = pd.DataFrame({
+				'created_date': created,
+				'sbs_no': 1,
+				'store_no': store_no,
+				'workstation': rng.choice(workstations, size=len(day)),
+				'elapsed_time': rng.gamma(2, 60, size=len(day)).astype('int64'),
+				'invc_type': (rng.random(len(day)) < 0.01).astype('int64'),
+				'status': (rng.random(len(day)) < 0.01).astype('int64'),
+			})
+			if year == CURRENT_YEAR:
+				cutoff = pd.Timestamp(dates['main_draw_start']) + pd.Timedelta(days=current_day, hours=14, minutes=47)
+				frame = frame[frame['created_date'] <= cutoff]
+			invoices.append(frame)
+	invoice_v = pd.concat(invoices, ignore_index=True)
+	invoice_v.insert(0, 'invc_sid', np.arange(1, len(invoice_v) + 1))
+
+	lines = rng.integers(1, 4, size=len(invoice_v))
+	n = lines.sum()
+	invc_item_v = pd.DataFrame({
+		'invc_sid': np.repeat(invoice_v['invc_sid'].to_numpy(), lines),
+		'qty': np.where(rng.random(n) < 0.05, -1, 1),
+		'price': np.where(rng.random(n) < 0.1, np.nan, rng.integers(5, 80, size=n).astype('float64')),
+		'orig_price': rng.integers(5, 80, size=n).astype('float64'),
+		'tax_amt': rng.integers(0, 5, size=n).astype('float64'),
+		'orig_tax_amt': 0.5,
+	})
+	return invoice_v, store_v, invc_item_v
+
+
+def extract(stores=4, registers=6, years=4, days=22, partition_minutes=30, invoices_per_day=500, current_year=CURRENT_YEAR, seed=0):
+	"""A daily extract with the columns of the query's final SELECT, as parsed (READ_DTYPES).
+
+	`stores` stores (the tournament's first, then T1, T2, ...) with `registers` registers each,
+	over the `years` years up to `current_year` and `days` date indexes from -7, in time
+	partitions of `partition_minutes` (a multiple of 30) through the opening hours. Volumes peak
+	in the early afternoon and registers are sometimes left idle, so every activity level and
+	status occurs; they are classified as the query does.
+	"""
+	if partition_minutes <= 0 or partition_minutes % 30:
+		raise ValueError("partition_minutes must be a multiple of 30 (extracts are held in half-hour slots)")
+	rng = np.random.default_rng(seed)
+	store_codes = (list(STORES) + [f'T{n}' for n in range(1, stores + 1)])[:stores]
+	opening, closing = ([int(part) for part in hhmi.split(':')] for hhmi in OPENING_HOURS)
+	partitions = np.arange(opening[0] * 60 + opening[1], closing[0] * 60 + closing[1] + 1, partition_minutes) / 60
+	ydtw = pd.MultiIndex.from_product([
+		np.arange(current_year - years + 1, current_year + 1),
+		np.arange(days) - 7,
+		partitions,
+		store_codes,
+		np.arange(1, registers + 1),
+	], names=VOLUME_KEYS).to_frame(index=False)
+
+	# invoices per store-day, spread over the day (busiest around 14:00) and the registers
+	profile = 0.6 + 2 * np.exp(-0.5 * ((partitions - 14) / 1.5) ** 2)
+	day_volume = invoices_per_day * rng.uniform(0.3, 1.7, size=(years * days, 1, len(store_codes), 1))
+	rate = day_volume * (profile / profile.sum())[None, :, None, None] / registers
+	rate = np.broadcast_to(rate, (years * days, len(partitions), len(store_codes), registers)).reshape(-1) # in the row order above
+	counts = rng.poisson(rate) * (rng.random(len(ydtw)) >= 0.08) # idle register-periods
+	ydtw['INVOICE_COUNT'] = counts
+	ydtw['TRANSACTIONS_TIME'] = (counts * rng.uniform(60, 180, size=len(ydtw))).round()
+	ydtw['QTY_ITEMS_SOLD'] = (counts * rng.uniform(1.5, 2.5, size=len(ydtw))).round()
+	ydtw['TOTAL_SALES'] = (ydtw['QTY_ITEMS_SOLD'] * rng.uniform(20, 60, size=len(ydtw))).round(2)
+	return classify(ydtw)
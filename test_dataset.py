@@ -0,0 +1,101 @@
+import pandas as pd
+import pytest
+
+from config import CURRENT_YEAR, TOURNAMENTS
+from cube import YDTW_KEYS
+from dataset import PartitionedDataset
+from ingest import prepare_uploads
+from query import extract_query
+from snapshots import connect_frames
+from synthetic import invoice_tables
+
+MAIN_DRAW_START = pd.Timestamp(TOURNAMENTS[CURRENT_YEAR]['main_draw_start'])
+
+
+@pytest.fixture(scope='module')
+def tables():
+	return invoice_tables(invoices_per_day=100, current_day=6, seed=0)
+
+
+def _cutoff(day):
+	return MAIN_DRAW_START + pd.Timedelta(days=day, hours=14, minutes=47)
+
+
+def _csv(tables, kept, date_index=None, **options):
+	"""The extract query's result as a CSV upload, for the invoices where `kept` holds (and the rows of `date_index`)."""
+	invoice_v, store_v, invc_item_v = tables
+	con = connect_frames(invoice_v[kept(invoice_v['created_date'])], store_v, invc_item_v)
+	try:
+		result = con.execute(extract_query(dialect='duckdb', **options)).df()
+	finally:
+		con.close()
+	if date_index is not None:
+		result = result[result['date_index'] == date_index]
+	return result.to_csv(index=False).encode()
+
+
+def _as_of(day):
+	return lambda created: created <= _cutoff(day)
+
+
+def _day_added(day):
+	"""The day before `day` as it was at its cutoff, then `day` up to its cutoff."""
+	start = MAIN_DRAW_START + pd.Timedelta(days=day)
+	return lambda created: (created <= _cutoff(day - 1)) | ((created >= start) & (created <= _cutoff(day)))
+
+
+def _rows(data_all):
+	data_all = data_all.astype({column: str for column in ['STORE_CODE', 'WORKSTATION_TYPE', 'ACTIVITY_LEVEL', 'STATUS']})
+	return data_all.sort_values(YDTW_KEYS).reset_index(drop=True)
+
+
+def _files(dataset):
+	return {key: open(dataset._path(key), 'rb').read() for key in dataset._partitions}
+
+
+def assert_same_rows(dataset, upload):
+	pd.testing.assert_frame_equal(_rows(dataset.frame()), _rows(prepare_uploads([('upload', upload)])))
+
+
+def test_current_year_delta(tables, tmp_path):
+	dataset = PartitionedDataset(str(tmp_path))
+	dataset.upsert(_csv(tables, _as_of(5)))
+	dataset.upsert(_csv(tables, _as_of(6), sparse=True, only_year=CURRENT_YEAR))
+	assert_same_rows(dataset, _csv(tables, _as_of(6)))
+
+
+def test_single_day_delta_keeps_the_other_days(tables, tmp_path):
+	dataset = PartitionedDataset(str(tmp_path))
+	dataset.upsert(_csv(tables, _as_of(6)))
+	before = _files(dataset)
+	keys = dataset.upsert(_csv(tables, _as_of(6), date_index=2, sparse=True, only_year=CURRENT_YEAR))
+
+	assert sorted(key[2] for key in keys) == [2] * len(keys)
+	after = _files(dataset)
+	assert after.keys() == before.keys()
+	assert {key: data for key, data in after.items() if key not in keys} == {key: data for key, data in before.items() if key not in keys}
+
+
+def test_same_upload_twice(tables, tmp_path):
+	upload = _csv(tables, _as_of(6))
+	dataset = PartitionedDataset(str(tmp_path))
+	dataset.upsert(upload)
+	files, version = _files(dataset), dataset.version
+
+	assert dataset.upsert(upload) == []
+	assert dataset.version == version
+	reloaded = PartitionedDataset(str(tmp_path)) # no record of the uploads applied: upserted again
+	reloaded.upsert(upload)
+	assert_same_rows(reloaded, upload)
+	assert _files(dataset) == files
+
+
+@pytest.mark.parametrize('sparse', [True, False])
+def test_later_day_completes_the_previous_latest_day(tables, tmp_path, sparse):
+	"""Day 5 was stored up to its cutoff; a delta with day 6 only gives it the rest of its time partitions."""
+	dataset = PartitionedDataset(str(tmp_path))
+	dataset.upsert(_csv(tables, _as_of(5)))
+	keys = dataset.upsert(_csv(tables, _day_added(6), date_index=6, sparse=sparse, only_year=CURRENT_YEAR))
+
+	assert {key[2] for key in keys} == {5, 6}
+	assert_same_rows(dataset, _csv(tables, _day_added(6)))
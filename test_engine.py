@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+from engine import classify, expand_baseplate, run_pipeline
+from query import extract_query
+from schema import READ_DTYPES
+from snapshots import connect_frames
+from synthetic import invoice_tables
+
+
+@pytest.fixture(scope='module')
+def tables():
+	return invoice_tables(invoices_per_day=300, seed=0) # enough for High periods and Unmanned registers
+
+
+@pytest.fixture(scope='module')
+def con(tables):
+	con = connect_frames(*tables)
+	yield con
+	con.close()
+
+
+def _run(con, sql):
+	result = con.execute(sql).df()
+	result.columns = result.columns.str.upper()
+	return result
+
+
+def invoice_lines(invoice_v, store_v, invc_item_v):
+	"""The invoice items the query reads (regular, non-cancelled sales), in engine.INVOICE_COLUMNS."""
+	lines = invc_item_v.merge(invoice_v, on='invc_sid').merge(store_v, on=['store_no', 'sbs_no'])
+	lines = lines[(lines['invc_type'] == 0) & (lines['status'] == 0)]
+	return lines.assign(
+		store=lines['store_name'],
+		amount=(lines['price'].fillna(lines['orig_price']) + lines['tax_amt'].fillna(lines['orig_tax_amt'])) * lines['qty'],
+	)
+
+
+@pytest.mark.parametrize('windowed', [False, True])
+def test_pipeline_matches_query(tables, con, windowed):
+	expected = _run(con, extract_query(windowed=windowed, dialect='duckdb')).astype(READ_DTYPES)
+	pd.testing.assert_frame_equal(run_pipeline(invoice_lines(*tables)).astype(READ_DTYPES), expected)
+
+
+@pytest.mark.parametrize('windowed', [False, True])
+def test_sparse_query_classified_matches_query(con, windowed):
+	expected = _run(con, extract_query(windowed=windowed, dialect='duckdb')).astype(READ_DTYPES)
+	volumes = _run(con, extract_query(sparse=True, windowed=windowed, dialect='duckdb'))
+	volumes = volumes.astype({'CREATED_YEAR': 'int64', 'DATE_INDEX': 'int64', 'WORKSTATION': 'int64', 'INVOICE_COUNT': 'int64'})
+	pd.testing.assert_frame_equal(classify(expand_baseplate(volumes)), expected)
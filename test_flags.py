@@ -0,0 +1,29 @@
+import itertools
+
+import pandas as pd
+import pytest
+
+from flags import derive_flags
+
+
+def _combinations():
+	"""One row per ACTIVITY_LEVEL x STATUS x WORKSTATION_TYPE x zero/non-zero INVOICE_COUNT."""
+	rows = itertools.product(['High', 'Mid', 'Low'], ['Unmanned', 'Manned'], ['Frictionless', 'Standard'], [0, 3])
+	return pd.DataFrame(list(rows), columns=['ACTIVITY_LEVEL', 'STATUS', 'WORKSTATION_TYPE', 'INVOICE_COUNT'])
+
+
+@pytest.mark.parametrize('categorical', [False, True]) # as read, and as compacted
+def test_flags_match_their_definitions(categorical):
+	data_all = _combinations()
+	if categorical:
+		data_all = data_all.astype({'ACTIVITY_LEVEL': 'category', 'STATUS': 'category', 'WORKSTATION_TYPE': 'category'})
+	expected = {
+		'Activity_Level_High': data_all.apply(lambda x: x['ACTIVITY_LEVEL'] == 'High', axis=1),
+		'Unmanned_High': data_all.apply(lambda x: x['ACTIVITY_LEVEL'] == 'High' and x['STATUS'] == 'Unmanned', axis=1),
+		'Frictionless': data_all.apply(lambda x: x['WORKSTATION_TYPE'] == 'Frictionless', axis=1),
+		'Zero_Volume': data_all.apply(lambda x: x['INVOICE_COUNT'] == 0, axis=1),
+	}
+
+	flagged = derive_flags(data_all.copy())
+	for column, values in expected.items():
+		pd.testing.assert_series_equal(flagged[column], values.astype(bool), check_names=False)
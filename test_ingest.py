@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+from engine import VOLUME_COLUMNS
+from ingest import read_upload
+from synthetic import extract
+
+
+@pytest.fixture(scope='module')
+def volumes():
+	return extract(stores=2, registers=3, years=2, days=4)
+
+
+@pytest.mark.parametrize('sparse', [False, True])
+def test_csv_headers_in_any_case(volumes, sparse):
+	if sparse:
+		volumes = volumes.loc[volumes['INVOICE_COUNT'] > 0, VOLUME_COLUMNS]
+	upper, complete = read_upload(volumes.to_csv(index=False).encode())
+	lower, _ = read_upload(volumes.rename(columns=str.lower).to_csv(index=False).encode()) # as DuckDB exports it
+	assert complete is not sparse
+	pd.testing.assert_frame_equal(lower, upper)
+
+
+@pytest.mark.parametrize('file_format', ['parquet', 'arrow'])
+def test_table_uploads_of_the_query_result(volumes, file_format):
+	import pyarrow as pa
+	import pyarrow.parquet as pq
+
+	# as the query exports it: lower-case names and CREATED_YEAR a string (TO_CHAR / strftime)
+	table = pa.Table.from_pandas(volumes.astype({'CREATED_YEAR': str}).rename(columns=str.lower), preserve_index=False)
+	sink = pa.BufferOutputStream()
+	if file_format == 'parquet':
+		pq.write_table(table, sink)
+	else:
+		with pa.ipc.new_file(sink, table.schema) as writer:
+			writer.write_table(table)
+	uploaded, complete = read_upload(sink.getvalue().to_pybytes())
+	expected, _ = read_upload(volumes.to_csv(index=False).encode())
+	assert complete
+	pd.testing.assert_frame_equal(uploaded, expected)
@@ -0,0 +1,76 @@
+import pandas as pd
+import pytest
+
+from config import CURRENT_YEAR
+from cube import YDTW_KEYS
+from engine import VOLUME_COLUMNS
+from ingest import prepare_uploads
+from merge import last_writer_wins
+from synthetic import extract
+
+
+@pytest.fixture(scope='module')
+def volumes():
+	# before CURRENT_YEAR, whose latest day a sparse file only has up to its latest sale
+	return extract(stores=3, registers=3, years=2, days=4, current_year=CURRENT_YEAR - 1)
+
+
+def _csv(frame):
+	return frame.to_csv(index=False).encode()
+
+
+def _rows(data_all):
+	data_all = data_all.astype({column: str for column in ['STORE_CODE', 'WORKSTATION_TYPE', 'ACTIVITY_LEVEL', 'STATUS']})
+	return data_all.sort_values(YDTW_KEYS).reset_index(drop=True)
+
+
+def _stores(volumes):
+	return [(store_code, volumes[volumes['STORE_CODE'] == store_code]) for store_code in volumes['STORE_CODE'].unique()]
+
+
+def test_last_writer_wins():
+	first = pd.DataFrame({'key': [1, 2, 3], 'value': [1.0, 2.0, float('nan')]})
+	second = pd.DataFrame({'key': [3, 4], 'value': [float('nan'), 4.0]})
+	third = pd.DataFrame({'key': [1, 2, 4], 'value': [1.0, 5.0, 6.0]})
+	merged, conflicts = last_writer_wins([first, second, third], ['first', 'second', 'third'], ['key'])
+
+	pd.testing.assert_frame_equal(merged.sort_values('key').reset_index(drop=True),
+		pd.DataFrame({'key': [1, 2, 3, 4], 'value': [1.0, 5.0, float('nan'), 6.0]}))
+	assert sorted(conflicts, key=lambda pair: (pair['kept'], pair['replaced'])) == [
+		{'kept': 'second', 'replaced': 'first', 'rows': 1, 'differing': 0}, # NaN and NaN are the same value
+		{'kept': 'third', 'replaced': 'first', 'rows': 2, 'differing': 1},
+		{'kept': 'third', 'replaced': 'second', 'rows': 1, 'differing': 1},
+	]
+
+
+def test_files_per_store(volumes):
+	data_all = prepare_uploads([(store_code, _csv(frame)) for store_code, frame in _stores(volumes)])
+
+	assert data_all.attrs['conflicts'] == []
+	pd.testing.assert_frame_equal(_rows(data_all), _rows(prepare_uploads([('all', _csv(volumes))])))
+
+
+def test_overlapping_files(volumes):
+	day = volumes[(volumes['DATE_INDEX'] == -5) & (volumes['STORE_CODE'] == volumes['STORE_CODE'].iloc[0])].copy()
+	changed = day['INVOICE_COUNT'] > 0
+	day.loc[changed, 'INVOICE_COUNT'] += 1
+	data_all = prepare_uploads([('all', _csv(volumes)), ('day', _csv(day))])
+
+	assert changed.any()
+	assert data_all.attrs['conflicts'] == [{'kept': 'day', 'replaced': 'all', 'rows': len(day), 'differing': int(changed.sum())}]
+	expected = pd.concat([volumes.drop(day.index), day])
+	pd.testing.assert_frame_equal(_rows(data_all), _rows(prepare_uploads([('expected', _csv(expected))])))
+
+
+def test_sparse_and_complete_files(volumes):
+	(first, complete), *others = _stores(volumes)
+	uploads = [(first, _csv(complete))] + [(store_code, _csv(frame.loc[frame['INVOICE_COUNT'] > 0, VOLUME_COLUMNS])) for store_code, frame in others]
+	data_all = prepare_uploads(uploads)
+
+	assert data_all.attrs['conflicts'] == []
+	pd.testing.assert_frame_equal(_rows(data_all), _rows(prepare_uploads([('all', _csv(volumes))])))
+
+	# the volume uploads are classified together, ranking as the last of them
+	second, frame = others[0]
+	data_all = prepare_uploads(uploads + [(f'{second} again', _csv(frame))])
+	assert data_all.attrs['conflicts'] == [{'kept': f'{second} again', 'replaced': ', '.join(store_code for store_code, _ in others), 'rows': len(frame), 'differing': 0}]
@@ -0,0 +1,72 @@
+import datetime
+import json
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Wall time and memory change of each stage of a page run, for the app's debug panel
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def resident_bytes():
+	"""Resident memory of this process, or None where /proc is not available.
+
+	The server is one process for every session, so a stage's change also counts whatever
+	other sessions and background threads allocated meanwhile.
+	"""
+	try:
+		with open('/proc/self/statm') as statm:
+			return int(statm.read().split()[1]) * _PAGE_SIZE
+	except (OSError, IndexError, ValueError):
+		return None
+
+
+class StageLog:
+	"""Stage timings of the latest runs (a page run, or a view's fragment rerun), oldest dropped first."""
+
+	def __init__(self, max_runs=50):
+		self.runs = deque(maxlen=max_runs)
+		self._run_count = 0
+		self._depth = 0
+
+	def start_run(self, label):
+		self._run_count += 1
+		self.runs.append({'run': self._run_count, 'label': label, 'started': datetime.datetime.now().isoformat(timespec='milliseconds'), 'stages': []})
+		self._depth = 0
+
+	@contextmanager
+	def stage(self, name):
+		"""Time the body as stage `name` of the current run; stages may nest."""
+		if not self.runs:
+			self.start_run('page')
+		record = {'stage': name, 'depth': self._depth}
+		self.runs[-1]['stages'].append(record) # in start order, so nested stages follow their parent
+		self._depth += 1
+		start, rss = time.perf_counter(), resident_bytes()
+		try:
+			yield
+		finally:
+			self._depth -= 1
+			record['seconds'] = time.perf_counter() - start
+			end_rss = resident_bytes()
+			record['memory_delta_bytes'] = end_rss - rss if rss is not None and end_rss is not None else None
+
+	def records(self):
+		"""One dict per stage of every run, oldest run first."""
+		return [{'run': run['run'], 'label': run['label'], 'started': run['started'], **stage}
+				for run in self.runs for stage in run['stages'] if 'seconds' in stage]
+
+	def frame(self, last_runs=None):
+		records = self.records()
+		if last_runs:
+			first = self._run_count - last_runs + 1
+			records = [record for record in records if record['run'] >= first]
+		frame = pd.DataFrame(records, columns=['run', 'label', 'started', 'stage', 'depth', 'seconds', 'memory_delta_bytes'])
+		return frame.astype({'seconds': 'float64', 'memory_delta_bytes': 'float64'}) # NaN where memory is unknown
+
+	def to_jsonl(self):
+		return ''.join(json.dumps(record) + '\n' for record in self.records())